@@ -2,9 +2,14 @@ import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
 import time
-from scanner import scan_stock
+from scanner import ScanResultStore, ScanMetrics
+from scan_executor import scan_universe
+from zone_store import ZoneStore
 from data import STOCK_GROUPS
 
+# Chart fill and border per Zone_Type
+ZONE_COLORS = {"Demand": ("rgba(102, 126, 234, 0.15)", "#667eea"), "Supply": ("rgba(239, 68, 68, 0.15)", "#ef4444")}
+
 # ================= PAGE CONFIG FIRST (FIXED) =================
 if "is_scanning" not in st.session_state:
     st.session_state.is_scanning = False
@@ -14,6 +19,12 @@ if "scan_results" not in st.session_state:
     st.session_state.scan_results = pd.DataFrame()
 if "visible_zones" not in st.session_state:
     st.session_state.visible_zones = {}
+if "result_store" not in st.session_state:
+    st.session_state.result_store = ScanResultStore()
+if "zone_store" not in st.session_state:
+    st.session_state.zone_store = ZoneStore()
+if "scan_metrics" not in st.session_state:
+    st.session_state.scan_metrics = ScanMetrics()
 
 # FIXED: Set config AFTER session state initialization
 sidebar_config = "collapsed" if st.session_state.is_scanning or not st.session_state.scan_results.empty else "expanded"
@@ -142,8 +153,8 @@ with st.sidebar:
     ENABLE_CONFLUENCE = st.toggle("🔄 Zone Confluence (HTF + LTF)", value=False)
     
     if ENABLE_CONFLUENCE:
-        HTF_INTERVAL = st.selectbox("Higher Timeframe (HTF)", ["1wk", "1mo", "3mo", "6mo"], index=1)
-        LTF_INTERVAL = st.selectbox("Lower Timeframe (LTF)", ["1d", "1wk", "1mo"], index=0)
+        HTF_INTERVAL = st.selectbox("Higher Timeframe (HTF)", ["1h", "4h", "1d", "1wk", "1mo", "3mo", "6mo"], index=4)
+        LTF_INTERVAL = st.selectbox("Lower Timeframe (LTF)", ["5m", "15m", "75m", "1h", "1d", "1wk", "1mo"], index=4)
         with st.expander("📊 HTF Settings"):
             ENGINE_BASE_MODE_HTF = "exact" if st.radio("HTF Base Mode", ["Up to (≤)", "Exactly (=)"], key="htf_bm") == "Exactly (=)" else "upto"
             HTF_BASE_COUNT = st.number_input("HTF Base Count", 1, 6, 3, key="htf_bc")
@@ -152,7 +163,7 @@ with st.sidebar:
             HTF_ZONE_STATUS = st.selectbox("HTF Status", ["Fresh Only", "Tested (Up to 1 time)", "Tested (Up to 2 times)"], key="htf_zs")
             HTF_ENABLE_ENTRY_FILTER = st.toggle("HTF Entry Filter", True, key="htf_ef")
             HTF_BUFFER = st.slider("HTF Price Distance", 0, 20, 15, key="htf_buf", disabled=not HTF_ENABLE_ENTRY_FILTER)
-            HTF_PATTERN = st.selectbox("HTF Pattern", ["RBR", "DBR", "Both"], 2, key="htf_pat")
+            HTF_PATTERN = st.selectbox("HTF Pattern", ["RBR", "DBR", "Both", "RBD", "DBD", "Supply", "All"], 2, key="htf_pat")
             HTF_MARKING_TYPE = st.selectbox("HTF Marking", ["Wick to Wick", "Body to Wick"], 0, key="htf_mark")
             HTF_LEGIN_THRESH = st.slider("HTF Leg-In %", 40, 95, 55, key="htf_li")
             HTF_LEGOUT_THRESH = st.slider("HTF Leg-Out %", 40, 95, 65, key="htf_lo")
@@ -166,14 +177,14 @@ with st.sidebar:
             LTF_ZONE_STATUS = st.selectbox("LTF Status", ["Fresh Only", "Tested (Up to 1 time)", "Tested (Up to 2 times)"], key="ltf_zs")
             LTF_ENABLE_ENTRY_FILTER = st.toggle("LTF Entry Filter", True, key="ltf_ef")
             LTF_BUFFER = st.slider("LTF Price Distance", 0, 20, 15, key="ltf_buf", disabled=not LTF_ENABLE_ENTRY_FILTER)
-            LTF_PATTERN = st.selectbox("LTF Pattern", ["RBR", "DBR", "Both"], 2, key="ltf_pat")
+            LTF_PATTERN = st.selectbox("LTF Pattern", ["RBR", "DBR", "Both", "RBD", "DBD", "Supply", "All"], 2, key="ltf_pat")
             LTF_MARKING_TYPE = st.selectbox("LTF Marking", ["Wick to Wick", "Body to Wick"], 0, key="ltf_mark")
             LTF_LEGIN_THRESH = st.slider("LTF Leg-In %", 40, 95, 55, key="ltf_li")
             LTF_LEGOUT_THRESH = st.slider("LTF Leg-Out %", 40, 95, 65, key="ltf_lo")
             LTF_BS_THRESH = st.slider("LTF Base Body %", 5, 50, 35, key="ltf_bst")
             LTF_STRICT_MODE = st.toggle("LTF Strict Breakout", True, key="ltf_sm")
     else:
-        INTERVAL = st.selectbox("⏱️ Time Frame", ["1d", "1wk", "1mo", "3mo", "6mo"], 0)
+        INTERVAL = st.selectbox("⏱️ Time Frame", ["5m", "15m", "75m", "1h", "4h", "1d", "1wk", "1mo", "3mo", "6mo"], 5)
         BASE_UI_MODE = st.radio("Base Mode", ["Up to (≤)", "Exactly (=)"], horizontal=True)
         ENGINE_BASE_MODE = "exact" if BASE_UI_MODE == "Exactly (=)" else "upto"
         BASE_COUNT = st.number_input("Base Candle Count", 1, 6, 3)
@@ -184,7 +195,7 @@ with st.sidebar:
         ENABLE_ENTRY_FILTER = st.toggle("Entry Barrier Filter", True)
         BUFFER = st.slider("Price Distance", 0, 20, 15, disabled=not ENABLE_ENTRY_FILTER)
         with st.expander("⚙️ Advanced"): 
-            PATTERN = st.selectbox("Pattern", ["RBR", "DBR", "Both"], 2)
+            PATTERN = st.selectbox("Pattern", ["RBR", "DBR", "Both", "RBD", "DBD", "Supply", "All"], 2)
             MARKING_TYPE = st.selectbox("Marking Type", ["Wick to Wick", "Body to Wick"], 0)
             LEGIN_THRESH = st.slider("Leg-In Exciting %", 40, 95, 55)
             LEGOUT_THRESH = st.slider("Leg-Out Exciting %", 40, 95, 65)
@@ -192,6 +203,11 @@ with st.sidebar:
             STRICT_MODE = st.toggle("Strict Breakout", True)
         HTF_INTERVAL = LTF_INTERVAL = INTERVAL; HTF_PATTERN = LTF_PATTERN = PATTERN; HTF_BASE_COUNT = LTF_BASE_COUNT = BASE_COUNT; HTF_LEGOUT_COUNT = LTF_LEGOUT_COUNT = LEGOUT_COUNT; HTF_LEGIN_THRESH = LTF_LEGIN_THRESH = LEGIN_THRESH; HTF_LEGOUT_THRESH = LTF_LEGOUT_THRESH = LEGOUT_THRESH; HTF_BS_THRESH = LTF_BS_THRESH = BS_THRESH; HTF_STRICT_MODE = LTF_STRICT_MODE = STRICT_MODE; HTF_BUFFER = LTF_BUFFER = BUFFER; ENGINE_BASE_MODE_HTF = ENGINE_BASE_MODE_LTF = ENGINE_BASE_MODE; ENGINE_LEGOUT_MODE_HTF = ENGINE_LEGOUT_MODE_LTF = ENGINE_LEGOUT_MODE; HTF_ENABLE_ENTRY_FILTER = LTF_ENABLE_ENTRY_FILTER = ENABLE_ENTRY_FILTER; HTF_ZONE_STATUS = LTF_ZONE_STATUS = ZONE_STATUS; HTF_MARKING_TYPE = LTF_MARKING_TYPE = MARKING_TYPE
 
+    with st.expander("🧹 Universe Prefilter", expanded=False):
+        MIN_PRICE = st.number_input("Min Price (0 = off)", min_value=0.0, value=0.0)
+        MIN_TURNOVER = st.number_input("Min Avg Turnover ₹ (0 = off)", min_value=0.0, value=0.0, step=1e7)
+    PREFILTER = {"min_price": MIN_PRICE or None, "min_turnover": MIN_TURNOVER or None}
+
     col_scan1, col_scan2 = st.columns(2)
     with col_scan1:
         if st.button("🔍 Scan Now", use_container_width=True, type="primary"):
@@ -203,6 +219,15 @@ with st.sidebar:
             st.session_state.is_scanning = False
             st.rerun()
 
+# Every scan_stock parameter after TICKER/PERIOD; also the result store key
+SCAN_PARAMS = (
+    HTF_INTERVAL, HTF_PATTERN, HTF_BASE_COUNT, HTF_LEGOUT_COUNT, HTF_LEGIN_THRESH, HTF_LEGOUT_THRESH, HTF_BS_THRESH, HTF_STRICT_MODE, HTF_BUFFER, ENGINE_BASE_MODE_HTF, ENGINE_LEGOUT_MODE_HTF, HTF_ENABLE_ENTRY_FILTER, HTF_ZONE_STATUS, HTF_MARKING_TYPE, 
+    LTF_INTERVAL, LTF_PATTERN, LTF_BASE_COUNT, LTF_LEGOUT_COUNT, LTF_LEGIN_THRESH, LTF_LEGOUT_THRESH, LTF_BS_THRESH, LTF_STRICT_MODE, LTF_BUFFER, ENGINE_BASE_MODE_LTF, ENGINE_LEGOUT_MODE_LTF, LTF_ENABLE_ENTRY_FILTER, LTF_ZONE_STATUS, LTF_MARKING_TYPE, 
+    ENABLE_CONFLUENCE,
+    ENABLE_SUPER_EXCITING,
+    SUPER_LOOKBACK
+)
+
 # ================= MAIN HEADER =================
 st.markdown(f"""
 <div class="main-header">
@@ -219,19 +244,16 @@ if st.session_state.is_scanning:
     # NEW: Progressive results container
     results_placeholder = st.empty()
     
-    for i, ticker in enumerate(scan_list):
-        status_text.markdown(f"**🔍 Scanning {ticker.replace('.NS','')}** ({i+1}/{len(scan_list)})")
-        
-        stock_df, result, error = scan_stock(
-            ticker, PERIOD, 
-            HTF_INTERVAL, HTF_PATTERN, HTF_BASE_COUNT, HTF_LEGOUT_COUNT, HTF_LEGIN_THRESH, HTF_LEGOUT_THRESH, HTF_BS_THRESH, HTF_STRICT_MODE, HTF_BUFFER, ENGINE_BASE_MODE_HTF, ENGINE_LEGOUT_MODE_HTF, HTF_ENABLE_ENTRY_FILTER, HTF_ZONE_STATUS, HTF_MARKING_TYPE, 
-            LTF_INTERVAL, LTF_PATTERN, LTF_BASE_COUNT, LTF_LEGOUT_COUNT, LTF_LEGIN_THRESH, LTF_LEGOUT_THRESH, LTF_BS_THRESH, LTF_STRICT_MODE, LTF_BUFFER, ENGINE_BASE_MODE_LTF, ENGINE_LEGOUT_MODE_LTF, LTF_ENABLE_ENTRY_FILTER, LTF_ZONE_STATUS, LTF_MARKING_TYPE, 
-            ENABLE_CONFLUENCE,
-            ENABLE_SUPER_EXCITING,
-            SUPER_LOOKBACK         
-        )
-        
+    st.session_state.scan_metrics = ScanMetrics()
+    scan_iter = scan_universe(scan_list, PERIOD, *SCAN_PARAMS, metrics=st.session_state.scan_metrics, prefilter=PREFILTER)
+    
+    # Results stream back in completion order, not list order
+    for i, (ticker, stock_df, result, error) in enumerate(scan_iter):
+        status_text.markdown(f"**🔍 Scanned {ticker.replace('.NS','')}** ({i+1}/{len(scan_list)})")
+        st.session_state.zone_store.record_scan(ticker, LTF_INTERVAL, stock_df, result)
+
         if result is not None and not result.empty:
+            st.session_state.result_store.put((stock_df, result, error), ticker, PERIOD, *SCAN_PARAMS)
             for _, p in result.iterrows():
                 row = {"Company": ticker.replace(".NS",""), "Pattern": p['Pattern_Found'], "Bases": p['Base_Count'], "LegOuts": p['LegOut_Count'], "Zone High": round(p['Zone_High'], 2), "Zone Low": round(p['Zone_Low'], 2), "Ticker": ticker, "Current Price": round(stock_df[f"Close_{ticker}"].iloc[-1], 2), "Tests": p['Tests']}
                 if ENABLE_CONFLUENCE: row["LTF Leg-In"], row["HTF Leg-In"] = p['LegIn_Date'], p.get('HTF_LegIn_Date', "N/A")
@@ -265,12 +287,27 @@ if st.session_state.is_scanning:
 if not st.session_state.scan_results.empty:
     df_res = st.session_state.scan_results
     c1, c2, c3, c4 = st.columns(4)
-    m_list = [("Total Zones", len(df_res), "🎯"), ("Unique Symbols", df_res['Company'].nunique(), "📊"), ("RBR Pattern", len(df_res[df_res['Pattern'] == 'Rally-Base-Rally']), "🟢"), ("DBR Pattern", len(df_res[df_res['Pattern'] == 'Drop-Base-Rally']), "🟡")]
+    counts = df_res['Pattern'].value_counts()
+    m_list = [("Total Zones", len(df_res), "🎯"), ("Unique Symbols", df_res['Company'].nunique(), "📊"), ("Demand RBR / DBR", f"{counts.get('Rally-Base-Rally', 0)} / {counts.get('Drop-Base-Rally', 0)}", "🟢"), ("Supply RBD / DBD", f"{counts.get('Rally-Base-Drop', 0)} / {counts.get('Drop-Base-Drop', 0)}", "🔴")]
     for col, (lbl, val, icon) in zip([c1, c2, c3, c4], m_list):
         col.markdown(f'<div class="metric-card"><div class="metric-lbl">{icon} {lbl}</div><div class="metric-val">{val}</div></div>', unsafe_allow_html=True)
     
-    tab1, tab2 = st.tabs(["📊 Dashboard", "📋 Raw Data"])
+    with st.expander("⏱️ Scan Metrics", expanded=False):
+        metrics = st.session_state.scan_metrics
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Wall Time", f"{metrics.wall:.1f}s")
+        m2.metric("Candidates", metrics.counters.get("candidates", 0))
+        m3.metric("Zones Kept", metrics.counters.get("zones", 0))
+        st.dataframe(metrics.stage_frame(), use_container_width=True, hide_index=True)
+        st.dataframe(pd.DataFrame(sorted(metrics.counters.items()), columns=["Counter", "Value"]), use_container_width=True, hide_index=True)
+        st.dataframe(pd.DataFrame(metrics.slowest(10), columns=["Ticker", "Seconds"]), use_container_width=True, hide_index=True)
+
+    tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "📋 Raw Data", "🗄️ Saved Zones"])
     with tab2: st.dataframe(df_res, use_container_width=True, hide_index=True)
+    with tab3:
+        near_pct = st.number_input("Within % of Price", min_value=0.5, max_value=50.0, value=5.0, step=0.5)
+        near_status = st.multiselect("Zone Status", ["fresh", "tested", "broken"], default=["fresh"])
+        if near_status: st.dataframe(st.session_state.zone_store.near_price(near_pct, near_status), use_container_width=True, hide_index=True)
     with tab1:
         ticker_list = df_res["Ticker"].unique().tolist()
         nav1, nav2, nav3 = st.columns([1, 8, 1])
@@ -282,14 +319,7 @@ if not st.session_state.scan_results.empty:
         
         col1, col2 = st.columns([3,1])
         with col1:
-            stock, result, error = scan_stock(
-                sel_tick, PERIOD, 
-                HTF_INTERVAL, HTF_PATTERN, HTF_BASE_COUNT, HTF_LEGOUT_COUNT, HTF_LEGIN_THRESH, HTF_LEGOUT_THRESH, HTF_BS_THRESH, HTF_STRICT_MODE, HTF_BUFFER, ENGINE_BASE_MODE_HTF, ENGINE_LEGOUT_MODE_HTF, HTF_ENABLE_ENTRY_FILTER, HTF_ZONE_STATUS, HTF_MARKING_TYPE, 
-                LTF_INTERVAL, LTF_PATTERN, LTF_BASE_COUNT, LTF_LEGOUT_COUNT, LTF_LEGIN_THRESH, LTF_LEGOUT_THRESH, LTF_BS_THRESH, LTF_STRICT_MODE, LTF_BUFFER, ENGINE_BASE_MODE_LTF, ENGINE_LEGOUT_MODE_LTF, LTF_ENABLE_ENTRY_FILTER, LTF_ZONE_STATUS, LTF_MARKING_TYPE, 
-                ENABLE_CONFLUENCE,
-                ENABLE_SUPER_EXCITING,
-                SUPER_LOOKBACK         
-            )
+            stock, result, error = st.session_state.result_store.scan(sel_tick, PERIOD, *SCAN_PARAMS)
         
         zones_for_ticker = df_res[df_res['Ticker'] == sel_tick]
         if zones_for_ticker.empty:
@@ -326,7 +356,8 @@ if not st.session_state.scan_results.empty:
                     for idx in visible_zone_indices:
                         if idx < len(result):
                             p = result.iloc[idx]
-                            fig.add_shape(type="rect", x0=p['LegIn_Date'], x1=stock.index[-1], y0=p['Zone_Low'], y1=p['Zone_High'], fillcolor="rgba(102, 126, 234, 0.15)", line=dict(color="#667eea", width=2, dash="dash"), editable=True)
+                            fill, border = ZONE_COLORS[p.get('Zone_Type', 'Demand')]
+                            fig.add_shape(type="rect", x0=p['LegIn_Date'], x1=stock.index[-1], y0=p['Zone_Low'], y1=p['Zone_High'], fillcolor=fill, line=dict(color=border, width=2, dash="dash"), editable=True)
                 
                 fig.update_layout(
                     height=650, margin=dict(t=0, b=0, l=0, r=0), 
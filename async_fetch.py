@@ -0,0 +1,121 @@
+import asyncio
+import random
+import threading
+import time
+import pandas as pd
+import scanner
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second on average, bursts of up to `capacity`."""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncFetcher:
+    """
+    Concurrent grouped fetches on top of the cached scanner fetch path.
+    Each request is one get_multi_timeframe_data_batch call for a chunk of tickers, so batched
+    downloads are kept. Requests are bounded by a semaphore, throttled by a token bucket (only when
+    a ticker needs the network) and retried with exponential backoff. Blocking calls run in worker
+    threads so the event loop stays free. start()/submit()/stop() run the loop on a background
+    thread for synchronous callers such as scan_universe; a fetcher serves one event loop.
+    """
+    def __init__(self, provider=None, concurrency=16, rate=5.0, burst=10, retries=3, backoff=0.5,
+                 use_cache=None, batch_size=scanner.BATCH_SIZE):
+        self.provider = provider
+        self.retries, self.backoff = retries, backoff
+        self.use_cache = scanner.USE_CACHE if use_cache is None else use_cache
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst)
+        self._loop = self._thread = None
+
+    def _needs_network(self, TICKERS, intervals):
+        if not self.use_cache: return True
+        return not all(scanner._cache_fresh(ticker, intervals) for ticker in TICKERS)
+
+    def _chunks(self, TICKERS):
+        return [list(TICKERS[i:i + self.batch_size]) for i in range(0, len(TICKERS), self.batch_size)]
+
+    async def fetch_batch(self, TICKERS, PERIOD, intervals, metrics=None):
+        """{ticker: {interval: frame}} from one grouped download. Raises after the last failed retry."""
+        def download():
+            with scanner.collect_metrics(metrics):
+                return scanner.get_multi_timeframe_data_batch(list(TICKERS), PERIOD, intervals, len(TICKERS),
+                                                              self.use_cache, self.provider)
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                if self._needs_network(TICKERS, intervals): await self._bucket.acquire()
+                try:
+                    return await asyncio.to_thread(download)
+                except Exception:
+                    if attempt == self.retries: raise
+                    await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    async def fetch(self, TICKER, PERIOD, INTERVAL):
+        """One ticker, resampled like get_resampled_data. Raises after the last failed retry."""
+        return (await self.fetch_batch([TICKER], PERIOD, [INTERVAL]))[TICKER][INTERVAL]
+
+    async def _batch_or_empty(self, chunk, PERIOD, INTERVAL):
+        try:
+            return {ticker: data[INTERVAL] for ticker, data in (await self.fetch_batch(chunk, PERIOD, [INTERVAL])).items()}
+        except Exception:
+            return {ticker: pd.DataFrame() for ticker in chunk}
+
+    async def iter_fetch(self, TICKERS, PERIOD, INTERVAL):
+        """Async generator of (ticker, frame), a batch at a time in completion order; failed batches give empty frames."""
+        tasks = [asyncio.ensure_future(self._batch_or_empty(chunk, PERIOD, INTERVAL)) for chunk in self._chunks(TICKERS)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for item in (await next_done).items(): yield item
+        finally:
+            for task in tasks: task.cancel()
+
+    async def fetch_many(self, TICKERS, PERIOD, INTERVAL):
+        batches = await asyncio.gather(*(self._batch_or_empty(chunk, PERIOD, INTERVAL) for chunk in self._chunks(TICKERS)))
+        return {ticker: frame for batch in batches for ticker, frame in batch.items()}
+
+    def start(self):
+        """Runs the event loop on a background thread so synchronous code can submit() batches."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-fetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, TICKERS, PERIOD, intervals, metrics=None):
+        """concurrent.futures.Future of fetch_batch on the background loop (see start())."""
+        return asyncio.run_coroutine_threadsafe(self.fetch_batch(TICKERS, PERIOD, intervals, metrics), self._loop)
+
+    def stop(self):
+        """Cancels every queued or running batch and shuts the background loop down."""
+        loop = self._loop
+        if loop is None: return
+        async def cancel_all():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.run_coroutine_threadsafe(cancel_all(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._loop = self._thread = None
+
+def fetch_all(TICKERS, PERIOD, INTERVAL, **options):
+    """Blocking wrapper around AsyncFetcher.fetch_many. Returns {ticker: frame}."""
+    async def run():
+        return await AsyncFetcher(**options).fetch_many(TICKERS, PERIOD, INTERVAL)
+    return asyncio.run(run())
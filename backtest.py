@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from scanner import find_demand_zones, get_multi_timeframe_data_batch, stamp_format, BATCH_SIZE
+from zone_index import RangeMinIndex
+
+TARGETS = (1.0, 2.0, 3.0)  # reward multiples of the zone height (R)
+
+def _simulate(hi, lo, starts, zone_highs, zone_lows, targets):
+    n, count = len(lo), len(starts)
+    levels = zone_highs[:, None] + np.asarray(targets, dtype=float)[None, :] * (zone_highs - zone_lows)[:, None]
+    lows, highs = RangeMinIndex(lo), RangeMinIndex(-hi)  # target hits are the first negated high <= -level
+    ends = np.full(count, n, dtype=np.int64)
+    entry_idx = lows.first_at_most(starts, ends, zone_highs)
+    stop_idx = lows.first_at_most(entry_idx, ends, zone_lows)
+    target_idx = np.empty((count, len(targets)), dtype=np.int64)
+    for k in range(len(targets)):
+        target_idx[:, k] = highs.first_at_most(entry_idx + 1, ends, -levels[:, k])
+    return entry_idx, stop_idx, target_idx
+
+def simulate_zones(stock, zones, targets=TARGETS):
+    """
+    Long trade per demand zone: limit entry at Zone_High on the first retest after the formation,
+    stop at Zone_Low, targets at Zone_High + k * (Zone_High - Zone_Low). Supply zones trade the
+    mirror image (short at Zone_Low, stop at Zone_High) by running the same walk on negated prices.
+    Each first touch is an O(log n) RangeMinIndex query, not a bar scan. A stop on the entry bar
+    counts (conservative); targets only count from the bar after entry.
+    Returns (entry_idx, stop_idx, target_idx[zone, target]); n means never.
+    """
+    hi, lo = stock['High'].to_numpy(dtype=float), stock['Low'].to_numpy(dtype=float)
+    starts = zones['End_Idx'].to_numpy(dtype=np.int64) + 1
+    zone_highs, zone_lows = zones['Zone_High'].to_numpy(dtype=float), zones['Zone_Low'].to_numpy(dtype=float)
+    supply = (zones['Zone_Type'] == "Supply").to_numpy() if 'Zone_Type' in zones else np.zeros(len(zones), dtype=bool)
+    if not supply.any(): return _simulate(hi, lo, starts, zone_highs, zone_lows, targets)
+    n = len(lo)
+    entry_idx, stop_idx = np.full(len(zones), n, dtype=np.int64), np.full(len(zones), n, dtype=np.int64)
+    target_idx = np.full((len(zones), len(targets)), n, dtype=np.int64)
+    for rows, args in ((~supply, (hi, lo, starts[~supply], zone_highs[~supply], zone_lows[~supply])),
+                       (supply, (-lo, -hi, starts[supply], -zone_lows[supply], -zone_highs[supply]))):
+        if rows.any(): entry_idx[rows], stop_idx[rows], target_idx[rows] = _simulate(*args, targets)
+    return entry_idx, stop_idx, target_idx
+
+def backtest_frame(stock, zones, TICKER, INTERVAL, targets=TARGETS):
+    """Tidy trade table: one row per (zone, target) with Outcome win/loss/open/no_entry and the R result."""
+    if zones is None or zones.empty: return pd.DataFrame()
+    # l_o variants are the same zone; trade it once, from the earliest completed leg-out
+    zones = zones.sort_values('LegOut_Count', kind='stable').drop_duplicates(subset=['Formation_ID'])
+    entry_idx, stop_idx, target_idx = simulate_zones(stock, zones, targets)
+    n = len(stock)
+    dates = stock.index.strftime(stamp_format(stock.index)).to_numpy()
+    date_at = lambda idx: np.where(idx < n, dates[np.minimum(idx, n - 1)], None)
+    tables = []
+    for k, reward in enumerate(targets):
+        hit = target_idx[:, k]
+        win = (hit < n) & (hit < stop_idx)
+        loss = (stop_idx < n) & ~win
+        entered = entry_idx < n
+        outcome = np.select([~entered, win, loss], ["no_entry", "win", "loss"], "open")
+        tables.append(pd.DataFrame({
+            'Ticker': TICKER, 'Interval': INTERVAL, 'Formation_ID': zones['Formation_ID'].to_numpy(),
+            'Zone_Type': zones['Zone_Type'].to_numpy() if 'Zone_Type' in zones else "Demand",
+            'Pattern_Found': zones['Pattern_Found'].to_numpy(), 'Base_Count': zones['Base_Count'].to_numpy(),
+            'LegOut_Count': zones['LegOut_Count'].to_numpy(), 'LegIn_Date': zones['LegIn_Date'].to_numpy(),
+            'Zone_High': zones['Zone_High'].to_numpy(), 'Zone_Low': zones['Zone_Low'].to_numpy(),
+            'Target_R': reward, 'Entry_Date': date_at(entry_idx),
+            'Exit_Date': date_at(np.where(win, hit, np.where(loss, stop_idx, n))),
+            'Outcome': outcome, 'R': np.select([win, loss], [reward, -1.0], np.nan)}))
+    return pd.concat(tables, ignore_index=True)
+
+def backtest(TICKERS, PERIOD, intervals, settings, targets=TARGETS, data=None, batch_size=BATCH_SIZE, use_cache=None):
+    """
+    Backtests every zone find_demand_zones reports for `settings` (its arguments after TICKER, as a dict)
+    across tickers and intervals. Zones are taken as formed, so broken ones are included and the
+    current-price entry filter and status limit are switched off. Returns the tidy trade table.
+    """
+    intervals = list(dict.fromkeys(intervals))
+    if data is None: data = get_multi_timeframe_data_batch(TICKERS, PERIOD, intervals, batch_size, use_cache)
+    settings = dict(settings, enable_entry_filter=False, zone_status_limit="All", include_broken=True)
+    tables = []
+    for ticker in TICKERS:
+        for interval in intervals:
+            stock = data.get(ticker, {}).get(interval)
+            if stock is None or stock.empty: continue
+            stock, zones = find_demand_zones(stock.copy(), ticker, **settings)
+            trades = backtest_frame(stock, zones, ticker, interval, targets)
+            if not trades.empty: tables.append(trades)
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+def hit_rates(trades, by=('Interval', 'Pattern_Found', 'Base_Count')):
+    """Per group and target: entered trades, wins, losses, still open, hit rate (wins / closed) and mean R."""
+    if trades.empty: return pd.DataFrame()
+    entered = trades[trades['Outcome'] != "no_entry"]
+    keys = list(by) + ['Target_R']
+    summary = entered.groupby(keys).agg(
+        Trades=('Outcome', 'size'), Wins=('Outcome', lambda o: int((o == "win").sum())),
+        Losses=('Outcome', lambda o: int((o == "loss").sum())), Open=('Outcome', lambda o: int((o == "open").sum())),
+        Avg_R=('R', 'mean')).reset_index()
+    closed = summary['Wins'] + summary['Losses']
+    summary['Hit_Rate'] = np.where(closed > 0, summary['Wins'] / closed.where(closed > 0, 1), np.nan)
+    return summary
@@ -0,0 +1,156 @@
+import argparse
+import inspect
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+import kernels
+import scanner
+import panel
+from providers import FrameProvider
+from cli import load_profile
+
+HISTORY_BARS = {"1y": 252, "5y": 1260, "10y": 2520, "max": 6000}
+PLANT_EVERY = 60  # bars between planted formations
+
+def synthetic_ohlcv(n_bars, seed, start="2000-01-03"):
+    """
+    Deterministic daily random walk with an RBR or DBR formation planted every PLANT_EVERY bars.
+    Planted bars satisfy the default profile (leg-in/leg-out bodies ~85-90%, base bodies < 10%,
+    leg-out close above the leg-in high). Returns (frame, planted) with planted rows (LegIn_Idx, Base_Count, Pattern).
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.015, n_bars)
+    kind = np.zeros(n_bars, dtype=np.int8)  # 0 walk, 1 leg-in, 2 base, 3 leg-out
+    planted = []
+    for legin in range(PLANT_EVERY, n_bars - 5, PLANT_EVERY):
+        b, rally = int(rng.integers(1, 4)), bool(rng.integers(0, 2))
+        returns[legin] = 0.03 if rally else -0.03
+        returns[legin + 1:legin + b + 1] = rng.normal(0, 0.0005, b)
+        returns[legin + b + 1] = 0.04
+        kind[legin], kind[legin + 1:legin + b + 1], kind[legin + b + 1] = 1, 2, 3
+        planted.append((legin, b, "Rally-Base-Rally" if rally else "Drop-Base-Rally"))
+    close = 100 * np.exp(np.cumsum(returns))
+    prev = np.append(100.0, close[:-1])
+    walk = kind == 0
+    op = np.where(walk, prev * (1 + rng.normal(0, 0.004, n_bars)), prev)
+    wick = np.abs(rng.normal(0, 0.006, (2, n_bars)))
+    # Planted bars get short wicks (0.2%); bases get wide ones so their bodies stay small
+    wick[:, ~walk] = 0.002
+    wick[:, kind == 2] = 0.006
+    hi = np.maximum(op, close) * (1 + wick[0])
+    lo = np.minimum(op, close) * (1 - wick[1])
+    index = pd.bdate_range(start, periods=n_bars)
+    frame = pd.DataFrame({"Open": op, "High": hi, "Low": lo, "Close": close,
+                          "Volume": rng.integers(100_000, 10_000_000, n_bars).astype(float)}, index=index)
+    return frame, pd.DataFrame(planted, columns=["LegIn_Idx", "Base_Count", "Pattern"])
+
+def _timed(fn, repeat):
+    """Best wall time of `repeat` runs and the last return value."""
+    best, value = np.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+def _detect_settings(params):
+    return [params[f"ltf_{name}"] for name in ("pattern", "base_count", "legout_count", "legin_thresh", "legout_thresh",
+                                                 "bs_thresh", "strict_mode", "buffer", "base_mode", "legout_mode",
+                                                 "enable_entry_filter", "zone_status", "marking_type")]
+
+def run_case(n_bars, n_tickers, params, repeat=3, htf="1mo"):
+    """Times each stage for one (history length, universe size) point."""
+    tickers = [f"SYN{i:04d}.NS" for i in range(n_tickers)]
+    universe = {t: synthetic_ohlcv(n_bars, seed) for seed, t in enumerate(tickers)}
+    provider = FrameProvider({t: frame for t, (frame, _) in universe.items()})
+    ltf = params["ltf_interval"]
+    rows = []
+    def record(stage, seconds, **extra):
+        rows.append({"stage": stage, "bars": n_bars, "tickers": n_tickers, "seconds": round(seconds, 6),
+                     "per_ticker_ms": round(1000 * seconds / n_tickers, 4), **extra})
+        return rows[-1]
+
+    seconds, data = _timed(lambda: scanner.get_multi_timeframe_data_batch(tickers, "max", [ltf, htf], use_cache=False,
+                                                                           provider=provider), repeat)
+    record("fetch_resample", seconds, intervals=[ltf, htf])
+
+    settings = _detect_settings(params)
+    detect = lambda: {t: scanner.find_demand_zones(data[t][ltf].copy(), t, *settings)[1] for t in tickers}
+    seconds, results = _timed(detect, repeat)
+    detect_row = record("find_demand_zones", seconds, zones=int(sum(len(r) for r in results.values() if r is not None)),
+           backend=kernels.get_backend())
+
+    if kernels.njit is not None:
+        # The other kernel backend must report identical zones over the same data
+        current = kernels.get_backend()
+        alternate = "numpy" if current == "numba" else "numba"
+        kernels.set_backend(alternate)
+        try:
+            seconds, other = _timed(detect, repeat)
+        finally:
+            kernels.set_backend(current)
+        same = all(results[t] is None if other[t] is None else results[t] is not None and results[t].equals(other[t]) for t in tickers)
+        record("find_demand_zones_alt_backend", seconds, backend=alternate, parity=same)
+
+    frames = {t: data[t][ltf] for t in tickers}
+    keywords = dict(zip(list(inspect.signature(scanner.find_demand_zones).parameters)[2:], settings))
+    seconds, result = _timed(lambda: panel.detect_frames(frames, **keywords), repeat)
+    record("detect_universe", seconds, zones=0 if result is None else len(result))
+
+    # Recall of planted formations, with every filter that depends on later bars switched off
+    recall_settings = settings[:10] + [False, "All", settings[12]]
+    found = planted = 0
+    for t in tickers:
+        _, zones = scanner.find_demand_zones(data[t][ltf].copy(), t, *recall_settings, include_broken=True)
+        marks = universe[t][1]
+        planted += len(marks)
+        if zones is None: continue
+        hits = set(zip(zones['LegIn_Idx'], zones['Base_Count'], zones['Pattern_Found']))
+        found += sum((row.LegIn_Idx, row.Base_Count, row.Pattern) in hits for row in marks.itertuples())
+    detect_row["planted_recall"] = round(found / planted, 4) if planted else None
+
+    conf = dict(params, htf_interval=htf, enable_confluence=True)
+    seconds, results = _timed(lambda: {t: scanner.scan_stock(t, "max", data=data[t], **conf)[1] for t in tickers}, repeat)
+    record("confluence_scan", seconds, zones=int(sum(len(r) for r in results.values() if r is not None)))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the scanner hot paths.")
+    parser.add_argument("--history", nargs="+", default=list(HISTORY_BARS), help=f"lengths: {', '.join(HISTORY_BARS)} or a bar count")
+    parser.add_argument("--tickers", nargs="+", type=int, default=[50], help="universe sizes, e.g. 50 500 2000")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best time is kept")
+    parser.add_argument("--profile", help="JSON scan profile (see cli.DEFAULT_PROFILE)")
+    parser.add_argument("--backend", choices=kernels.BACKENDS, default="auto", help="zone-test kernel (numba needs numba installed)")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    try:
+        kernels.set_backend(args.backend)
+    except ImportError as exc:
+        parser.error(str(exc))
+
+    params = load_profile(args.profile)
+    results = []
+    for history, n_tickers in itertools.product(args.history, args.tickers):
+        n_bars = HISTORY_BARS.get(history) or int(history)
+        for row in run_case(n_bars, n_tickers, params, args.repeat):
+            results.append(dict(row, history=history))
+            print(f"{history:>5} {n_tickers:>5} {row['stage']:<18} {row['seconds']:.3f}s", file=sys.stderr)
+    report = {"meta": {"timestamp": pd.Timestamp.now().isoformat(timespec='seconds'), "python": platform.python_version(),
+                       "numpy": np.__version__, "pandas": pd.__version__, "cpus": os.cpu_count(),
+                       "machine": platform.machine(), "repeat": args.repeat,
+                       "backend": kernels.get_backend(), "numba": kernels.njit is not None, "profile": params},
+              "results": results}
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as fh: fh.write(text)
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import argparse
+import inspect
+import json
+import os
+import sys
+import pandas as pd
+from scanner import scan_stock, ScanMetrics, ZONE_COLUMNS
+from scan_executor import scan_universe, SCAN_WORKERS
+from zone_store import ZoneStore
+from prefilter import THRESHOLDS
+from data import STOCK_GROUPS
+
+# Same defaults as the single-timeframe sidebar in app.py
+DEFAULT_PROFILE = {
+    "interval": "1d", "pattern": "Both", "base_count": 3, "legout_count": 1,
+    "legin_thresh": 55, "legout_thresh": 65, "bs_thresh": 35, "strict_mode": True,
+    "buffer": 15, "base_mode": "upto", "legout_mode": "upto", "enable_entry_filter": True,
+    "zone_status": "Fresh Only", "marking_type": "Wick to Wick",
+    "enable_confluence": False, "enable_super_exciting": False, "super_lookback": 20,
+}
+
+RESULT_COLUMNS = ['Ticker', 'Current_Price'] + ZONE_COLUMNS
+
+SCAN_PARAM_NAMES = [name for name in inspect.signature(scan_stock).parameters if name not in ("TICKER", "PERIOD", "data")]
+
+def load_profile(path=None):
+    """
+    scan_stock keyword arguments from a JSON profile layered over DEFAULT_PROFILE.
+    Unprefixed keys (e.g. "base_count") set both the htf_ and ltf_ parameter, like the
+    single-timeframe sidebar does; prefixed keys override one side.
+    """
+    profile = dict(DEFAULT_PROFILE)
+    if path:
+        with open(path) as fh: profile.update(json.load(fh))
+    params = {}
+    for key, value in profile.items():
+        if key in SCAN_PARAM_NAMES: continue
+        if f"htf_{key}" not in SCAN_PARAM_NAMES: raise ValueError(f"Unknown profile setting: {key}")
+        params[f"htf_{key}"] = params[f"ltf_{key}"] = value
+    params.update((key, value) for key, value in profile.items() if key in SCAN_PARAM_NAMES)
+    return params
+
+def load_tickers(args):
+    if args.tickers: return args.tickers
+    if args.ticker_file:
+        with open(args.ticker_file) as fh:
+            return [line.split("#")[0].strip() for line in fh if line.split("#")[0].strip()]
+    if args.group not in STOCK_GROUPS: raise ValueError(f"Unknown group {args.group!r}; choose from {', '.join(STOCK_GROUPS)}")
+    return STOCK_GROUPS[args.group]
+
+def write_results(frame, path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower() or "csv"
+    if fmt == "csv": frame.to_csv(path, index=False)
+    elif fmt == "parquet": frame.to_parquet(path, index=False)
+    elif fmt == "json": frame.to_json(path, orient="records", indent=2)
+    else: raise ValueError(f"Unsupported output format: {fmt}")
+
+def run_scan(TICKERS, PERIOD, params, workers=None, use_cache=None, zone_db=None, progress=None, metrics=None, prefilter=None):
+    """Scans TICKERS headlessly; returns (zones frame, {ticker: error})."""
+    store = ZoneStore(zone_db) if zone_db else None
+    frames, errors = [], {}
+    for i, (ticker, stock, result, error) in enumerate(scan_universe(TICKERS, PERIOD, max_workers=workers, use_cache=use_cache,
+                                                                    metrics=metrics, prefilter=prefilter, **params)):
+        if store is not None: store.record_scan(ticker, params["ltf_interval"], stock, result)
+        if error: errors[ticker] = error
+        if result is not None and not result.empty:
+            frames.append(result.assign(Ticker=ticker, Current_Price=stock['Close'].iloc[-1]))
+        if progress: progress(i + 1, len(TICKERS), ticker)
+    if store is not None: store.close()
+    # An empty run still carries the header so scheduled consumers can read the file
+    zones = pd.concat(frames) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+    zones = zones[['Ticker', 'Current_Price'] + [col for col in zones.columns if col not in ('Ticker', 'Current_Price')]]
+    return zones, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless demand zone scan.")
+    universe = parser.add_mutually_exclusive_group()
+    universe.add_argument("--group", default="Nifty 50", help=f"STOCK_GROUPS name ({', '.join(STOCK_GROUPS)})")
+    universe.add_argument("--ticker-file", help="one ticker per line, # comments allowed")
+    universe.add_argument("--tickers", nargs="+", help="explicit tickers, e.g. RELIANCE.NS TCS.NS")
+    parser.add_argument("--period", default="1y", help="lookback, e.g. 1y, 5y, max")
+    parser.add_argument("--profile", help="JSON file of scan_stock settings (see DEFAULT_PROFILE)")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="scan processes")
+    parser.add_argument("--no-cache", action="store_true", help="skip the local OHLCV cache")
+    parser.add_argument("--zone-db", help="also record zones in this SQLite zone store")
+    parser.add_argument("--metrics", help="write stage timings and counters (JSON) here")
+    parser.add_argument("--min-price", type=float, help="prefilter: skip tickers whose last close is below this")
+    parser.add_argument("--max-price", type=float, help="prefilter: skip tickers whose last close is above this")
+    parser.add_argument("--min-avg-volume", type=float, help="prefilter: minimum 20-day average volume")
+    parser.add_argument("--min-turnover", type=float, help="prefilter: minimum 20-day average close x volume")
+    parser.add_argument("--min-range-pct", type=float, help="prefilter: minimum 20-day high-low range, %% of close")
+    parser.add_argument("--format", choices=["csv", "parquet", "json"], help="defaults to the output extension")
+    parser.add_argument("-o", "--output", default="zones.csv")
+    parser.add_argument("--strict", action="store_true", help="exit 2 if any ticker failed (default: only when all did)")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        params, tickers = load_profile(args.profile), load_tickers(args)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    progress = None if args.quiet else lambda done, total, ticker: print(f"[{done}/{total}] {ticker}", file=sys.stderr)
+    metrics = ScanMetrics()
+    prefilter = {name: getattr(args, name) for name in THRESHOLDS}
+    zones, errors = run_scan(tickers, args.period, params, args.workers, False if args.no_cache else None, args.zone_db, progress,
+                             metrics, prefilter)
+    write_results(zones, args.output, args.format)
+    if args.metrics:
+        with open(args.metrics, "w") as fh: json.dump(metrics.as_dict(), fh, indent=2)
+    skipped = [t for t, e in errors.items() if e.startswith("Skipped:")]
+    failed = {t: e for t, e in errors.items() if e != "No Confluence Zone Found" and t not in skipped}
+    print(f"{len(zones)} zones across {zones['Ticker'].nunique() if not zones.empty else 0} tickers -> {args.output}"
+          f" ({len(skipped)} skipped by prefilter, {len(failed)} failed)", file=sys.stderr)
+    # Non-zero exits let schedulers notice a broken run (e.g. every download failed)
+    scanned = len(tickers) - len(skipped)
+    if failed and len(failed) >= scanned: return 1
+    if failed and args.strict: return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import inspect
+from collections import deque
+import pandas as pd
+from scanner import Zone, ZONE_COLUMNS, PATTERNS, find_demand_zones, frame_to_zones, pattern_keys, stamp_format, _status_limit
+
+PATTERN_ORDER = {"Rally-Base-Rally": 0, "Drop-Base-Rally": 1}
+
+class IncrementalZoneDetector:
+    """
+    Stateful find_demand_zones for one ticker, fed one completed bar at a time.
+    Only the last num_bases + num_legouts + 1 classified bars are kept, so a new bar costs
+    O(open zones) for tests/breaks plus a fixed number of pattern checks ending at that bar.
+    Takes the same parameters as find_demand_zones (minus the frame); result() matches its output.
+    Demand patterns only: a selection including supply patterns raises ValueError.
+    """
+    def __init__(self, TICKER, pattern_choice, num_bases, num_legouts,
+                 legin_threshold, legout_threshold, base_threshold,
+                 strict_mode, entry_buffer_pct, base_mode, legout_mode,
+                 enable_entry_filter, zone_status_limit, marking_type,
+                 enable_super_exciting=False, super_lookback=20):
+        self.TICKER = TICKER
+        # Supply zones come from the batch scan; dropping them silently would hide zones the caller asked for
+        supply = [key for key in pattern_keys(pattern_choice) if PATTERNS[key][1] == "Supply"]
+        if supply: raise ValueError(f"IncrementalZoneDetector tracks demand patterns only, got {', '.join(supply)}")
+        self.patterns = [PATTERNS[key][0] for key in pattern_keys(pattern_choice)]
+        self.legin_threshold, self.legout_threshold, self.base_threshold = legin_threshold, legout_threshold, base_threshold
+        self.strict_mode, self.marking_type = strict_mode, marking_type
+        self.buffer_multiplier = 1 + (entry_buffer_pct / 100)
+        self.enable_entry_filter = enable_entry_filter
+        self.max_tests = _status_limit(zone_status_limit)
+        self.base_range = [num_bases] if base_mode == "exact" else list(range(1, num_bases + 1))
+        self.legout_range = [num_legouts] if legout_mode == "exact" else list(range(1, num_legouts + 1))
+        self.enable_super_exciting, self.super_lookback = enable_super_exciting, super_lookback
+
+        self._bars = deque(maxlen=max(self.base_range) + max(self.legout_range) + 1)
+        self._ranges = deque(maxlen=super_lookback)
+        self._open = []  # [zone, entry price, leg-in timestamp] of every unbroken zone within the status limit
+        self.bar_count = 0
+        self.last_stamp = None
+        self.current_price = None
+
+    @classmethod
+    def from_history(cls, stock, TICKER, *params, **kw):
+        """Bootstraps from a full history with one batch pass instead of replaying every bar."""
+        det = cls(TICKER, *params, **kw)
+        if stock.empty: return det
+        bound = inspect.signature(find_demand_zones).bind(stock[['Open', 'High', 'Low', 'Close']].copy(), TICKER, *params, **kw)
+        bound.arguments['enable_entry_filter'] = False  # entry band is applied against the live price in result()
+        _, result = find_demand_zones(*bound.args, **bound.kwargs)
+        # Classification state only needs the tail: the bar window plus the range lookback before it
+        tail = len(stock) - (det._bars.maxlen + det.super_lookback)
+        for row in stock.iloc[max(tail, 0):].itertuples():
+            det._classify(row.Index, row.Open, row.High, row.Low, row.Close)
+        det.bar_count, det.last_stamp = len(stock), stock.index[-1]
+        opens = stock['Open'].to_numpy(dtype=float)
+        for zone, stamp in zip(frame_to_zones(result), result.index if result is not None else []):
+            det._open.append([zone, opens[zone.LegIn_Idx + zone.Base_Count + 1], stamp])
+        return det
+
+    def _classify(self, stamp, o, h, l, c):
+        abs_hl = abs(h - l)
+        body_pct = abs(c - o) / (abs_hl if abs_hl != 0 else 0.001) * 100
+        self._ranges.append(abs_hl)
+        if self.enable_super_exciting:
+            qualified = len(self._ranges) == self.super_lookback and abs_hl >= sum(self._ranges) / self.super_lookback
+        else:
+            qualified = True
+        green, red = o < c, o > c
+        self.current_price = c
+        self._bars.append((stamp, o, h, l, c,
+                           body_pct <= self.base_threshold,                          # base
+                           body_pct >= self.legin_threshold and green and qualified,  # leg-in green
+                           body_pct >= self.legin_threshold and red and qualified,    # leg-in red
+                           body_pct >= 50 and green and qualified,                    # standard exciting
+                           body_pct >= self.legout_threshold and green and qualified))  # user leg-out
+
+    def _completed_formations(self):
+        """Formations whose last leg-out candle is the newest bar."""
+        bars, n = self._bars, len(self._bars)
+        exc_run = 0
+        while exc_run < n and bars[n - 1 - exc_run][8]: exc_run += 1
+        found = []
+        for l_o in self.legout_range:
+            legout = n - l_o
+            if legout < 1 or exc_run < l_o - 1 or not bars[legout][9]: continue
+            base_run = 0
+            while base_run < legout and bars[legout - 1 - base_run][5]: base_run += 1
+            for b in self.base_range:
+                idx = legout - b - 1
+                if idx < 0 or base_run < b: continue
+                if self.strict_mode and not bars[legout][4] > bars[idx][2]: continue
+                for label in self.patterns:
+                    if bars[idx][6 if label == "Rally-Base-Rally" else 7]:
+                        found.append(self._make_zone(label, idx, b, l_o))
+        return found
+
+    def _make_zone(self, label, idx, b, l_o):
+        bars = self._bars
+        base = [bars[k] for k in range(idx + 1, idx + b + 1)]
+        base_max_high, base_min_low = max(bar[2] for bar in base), min(bar[3] for bar in base)
+        zone_high = max(max(bar[1], bar[4]) for bar in base) if self.marking_type == "Body to Wick" else base_max_high
+        zone_low = min(base_min_low, bars[idx + b + 1][3])
+        if label == "Drop-Base-Rally": zone_low = min(zone_low, bars[idx][3])
+        stamp = bars[idx][0]
+        legin_idx = self.bar_count - len(bars) + idx
+        legin_date = stamp.strftime(stamp_format(pd.DatetimeIndex([stamp])))
+        zone = Zone(label, b, l_o, legin_date, zone_high, zone_low, 0, base_max_high, base_min_low,
+                    f"{self.TICKER}_{legin_date}_{label}_{b}", legin_idx, legin_idx + b + l_o)
+        return [zone, bars[idx + b + 1][1], stamp]
+
+    def push(self, stamp, o, h, l, c):
+        """Applies one bar. Returns (completed, broken) lists of Zone records."""
+        still_open, broken = [], []
+        for entry in self._open:
+            zone = entry[0]
+            if l < zone.Zone_Low:
+                broken.append(zone); continue
+            if l <= zone.Zone_High:
+                zone.Tests += 1
+                if zone.Tests > self.max_tests: continue
+            still_open.append(entry)
+        self._open = still_open
+        self._classify(stamp, o, h, l, c)
+        self.bar_count += 1
+        self.last_stamp = stamp
+        completed = self._completed_formations()
+        self._open.extend(completed)
+        return [entry[0] for entry in completed], broken
+
+    def update(self, bar):
+        """One bar as a Series with Open/High/Low/Close, named by its timestamp (e.g. stock.iloc[-1])."""
+        return self.push(bar.name, bar['Open'], bar['High'], bar['Low'], bar['Close'])
+
+    def feed(self, stock):
+        """Applies every bar of stock newer than the last one seen. Returns (completed, broken)."""
+        if self.last_stamp is not None: stock = stock[stock.index > self.last_stamp]
+        completed, broken = [], []
+        for row in stock.itertuples():
+            new, gone = self.push(row.Index, row.Open, row.High, row.Low, row.Close)
+            completed.extend(new); broken.extend(gone)
+        return completed, broken
+
+    def open_zones(self):
+        return [entry[0] for entry in self._open]
+
+    def result(self):
+        """Current zones as find_demand_zones would report them for the bars seen so far, or None."""
+        rows = self._open
+        if self.enable_entry_filter:
+            rows = [entry for entry in rows
+                    if entry[1] <= self.current_price <= entry[1] * self.buffer_multiplier]
+        if not rows: return None
+        rows = sorted(rows, key=lambda e: (PATTERN_ORDER[e[0].Pattern_Found], e[0].Base_Count, e[0].LegOut_Count, e[0].LegIn_Idx))
+        return pd.DataFrame([[getattr(entry[0], col) for col in ZONE_COLUMNS] for entry in rows],
+                            columns=ZONE_COLUMNS, index=pd.DatetimeIndex([entry[2] for entry in rows]))
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import ohlcv_cache
+
+# NSE cash session; intraday bars are anchored to the open, so 75m gives five bars a day and 4h two
+SESSION_TZ = "Asia/Kolkata"
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_MINUTES = 375
+
+INTERVAL_MINUTES = {"5m": 5, "15m": 15, "30m": 30, "75m": 75, "1h": 60, "60m": 60, "4h": 240}
+# Yahoo feed each interval is built from; coarser feeds reach further back
+FETCH_BASE = {"5m": "5m", "15m": "15m", "30m": "15m", "75m": "15m", "1h": "60m", "60m": "60m", "4h": "60m"}
+# Longest history Yahoo serves per intraday feed
+MAX_PERIOD = {"5m": "60d", "15m": "60d", "60m": "730d"}
+STREAM_ROWS = 50_000  # base bars aggregated per step
+
+def is_intraday(INTERVAL):
+    return INTERVAL.lower() in INTERVAL_MINUTES
+
+def base_interval(intervals):
+    """Finest Yahoo feed any requested interval needs; every other one is a multiple of it."""
+    bases = {FETCH_BASE[iv.lower()] for iv in intervals}
+    return min(bases, key=lambda base: INTERVAL_MINUTES[base])
+
+def clamp_period(PERIOD, INTERVAL):
+    """PERIOD, shortened to what Yahoo serves for an intraday feed."""
+    limit = MAX_PERIOD.get(INTERVAL)
+    if limit is None: return PERIOD
+    start = ohlcv_cache.period_start(PERIOD, INTERVAL)
+    return limit if start is None or start < ohlcv_cache.period_start(limit, INTERVAL) else PERIOD
+
+def _bucket_labels(index, minutes):
+    """Session-anchored bar label (local wall time, ns) per row, and whether the row is inside the session."""
+    local = index.tz_convert(SESSION_TZ).tz_localize(None) if index.tz is not None else index
+    local = local.as_unit("ns")
+    day = local.normalize()
+    since_open = (local.asi8 - day.asi8 - SESSION_OPEN.value) // 60_000_000_000  # whole minutes, floored
+    in_session = (since_open >= 0) & (since_open < SESSION_MINUTES)
+    labels = day.asi8 + SESSION_OPEN.value + (since_open // minutes) * minutes * 60_000_000_000
+    return labels, in_session
+
+def _aggregate(stock, minutes):
+    """(labels, open, high, low, close, volume) of the session bars in one sorted base chunk."""
+    stock = stock.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    labels, in_session = _bucket_labels(pd.DatetimeIndex(stock.index), minutes)
+    labels = labels[in_session]
+    values = {col: stock[col].to_numpy(dtype=float)[in_session] for col in ('Open', 'High', 'Low', 'Close')}
+    volume = stock['Volume'].to_numpy(dtype=float)[in_session] if 'Volume' in stock else np.zeros(len(labels))
+    if len(labels) == 0: return labels, *(np.empty(0) for _ in range(5))
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    lasts = np.r_[starts[1:] - 1, len(labels) - 1]
+    return (labels[starts], values['Open'][starts], np.maximum.reduceat(values['High'], starts),
+            np.minimum.reduceat(values['Low'], starts), values['Close'][lasts], np.add.reduceat(np.nan_to_num(volume), starts))
+
+def _frame(bars, tz):
+    labels, op, hi, lo, cl, vol = bars
+    index = pd.DatetimeIndex(labels.view("datetime64[ns]"))
+    index = index.tz_localize(SESSION_TZ) if tz is not None else index
+    if tz is not None and str(tz) != SESSION_TZ: index = index.tz_convert(tz)
+    return pd.DataFrame({'Open': op, 'High': hi, 'Low': lo, 'Close': cl, 'Volume': vol}, index=index)
+
+def stream_resample(chunks, INTERVAL):
+    """
+    Aggregates an iterable of consecutive base frames into session-aligned INTERVAL bars, yielding
+    one frame per chunk. Only the open (possibly unfinished) bar is carried between chunks, so
+    memory is bounded by the chunk size, not the history length.
+    """
+    minutes = INTERVAL_MINUTES[INTERVAL.lower()]
+    carry = None
+    for chunk in chunks:
+        if chunk is None or chunk.empty: continue
+        tz = pd.DatetimeIndex(chunk.index).tz
+        if carry is not None: chunk = pd.concat([carry, chunk])
+        labels = _bucket_labels(pd.DatetimeIndex(chunk.index), minutes)[0]
+        # Rows of the last bucket may continue in the next chunk
+        tail = np.searchsorted(labels, labels[-1])
+        carry = chunk.iloc[tail:]
+        if tail: yield _frame(_aggregate(chunk.iloc[:tail], minutes), tz)
+    if carry is not None and not carry.empty:
+        yield _frame(_aggregate(carry, minutes), pd.DatetimeIndex(carry.index).tz)
+
+def resample_session(stock, INTERVAL, chunk_rows=STREAM_ROWS):
+    """
+    INTERVAL bars anchored to the NSE open (09:15 IST), built from finer bars a chunk at a time.
+    stock is already in memory, so chunking only bounds the intermediate groupby; the history
+    itself is bounded by MAX_PERIOD (60d of 5m bars is a few thousand rows, one chunk).
+    """
+    if stock.empty: return stock
+    chunks = (stock.iloc[i:i + chunk_rows] for i in range(0, len(stock), chunk_rows))
+    frames = [frame for frame in stream_resample(chunks, INTERVAL) if not frame.empty]
+    return pd.concat(frames) if frames else stock.iloc[:0]
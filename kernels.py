@@ -0,0 +1,43 @@
+import os
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # optional: the NumPy path in scanner is used instead
+    njit = None
+
+BACKENDS = ("auto", "numba", "numpy")
+_backend = os.environ.get("ZONE_KERNEL_BACKEND", "auto")
+
+def set_backend(name):
+    """Selects the zone-test kernel at runtime: "numba", "numpy", or "auto" (numba when installed)."""
+    global _backend
+    if name not in BACKENDS: raise ValueError(f"Unknown kernel backend {name!r}; choose from {', '.join(BACKENDS)}")
+    if name == "numba" and njit is None: raise ImportError("The numba backend needs numba installed (pip install numba)")
+    _backend = name
+
+def get_backend():
+    """The backend actually in use: "numba" or "numpy"."""
+    return "numba" if _backend != "numpy" and njit is not None else "numpy"
+
+def _zone_tests_loop(lows, starts, zone_lows, zone_highs, ends, tests, break_idx):
+    """Per-zone forward walk: stops at the break instead of visiting every later bar."""
+    for z in range(len(starts)):
+        count = 0
+        for i in range(starts[z], ends[z]):
+            if lows[i] < zone_lows[z]:
+                break_idx[z] = i
+                break
+            if lows[i] <= zone_highs[z]: count += 1
+        tests[z] = count
+
+_zone_tests_jit = njit(cache=True, nogil=True)(_zone_tests_loop) if njit is not None else None
+
+def zone_tests(lows, starts, zone_lows, zone_highs, ends, kernel=None):
+    """Same contract as scanner._zone_tests; kernel defaults to the compiled walk."""
+    tests = np.zeros(len(starts), dtype=np.int64)
+    break_idx = np.full(len(starts), -1, dtype=np.int64)
+    (kernel or _zone_tests_jit)(np.asarray(lows, dtype=np.float64), np.asarray(starts, dtype=np.int64),
+                                np.asarray(zone_lows, dtype=np.float64), np.asarray(zone_highs, dtype=np.float64),
+                                np.ascontiguousarray(ends, dtype=np.int64), tests, break_idx)
+    return tests, break_idx
@@ -1,10 +1,14 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
-import time
-from scanner import scan_stock
+from scanner import ScanResultStore, ScanMetrics
+from scan_executor import scan_universe
+from zone_store import ZoneStore
 from data import STOCK_GROUPS
 
+# Chart fill and border per Zone_Type
+ZONE_COLORS = {"Demand": ("rgba(102, 126, 234, 0.15)", "#667eea"), "Supply": ("rgba(239, 68, 68, 0.15)", "#ef4444")}
+
 # ================= VIEW STATE MANAGEMENT =================
 if "view" not in st.session_state:
     st.session_state.view = "landing"
@@ -14,6 +18,12 @@ if "ticker_index" not in st.session_state:
     st.session_state.ticker_index = 0
 if "scan_results" not in st.session_state:
     st.session_state.scan_results = pd.DataFrame()
+if "result_store" not in st.session_state:
+    st.session_state.result_store = ScanResultStore()
+if "zone_store" not in st.session_state:
+    st.session_state.zone_store = ZoneStore()
+if "scan_metrics" not in st.session_state:
+    st.session_state.scan_metrics = ScanMetrics()
 
 sb_state = "expanded" if st.session_state.view == "scanner" else "collapsed"
 
@@ -136,8 +146,8 @@ def render_scanner():
         ENABLE_CONFLUENCE = st.toggle("🔄 Zone Confluence (HTF + LTF)", value=False)
       
         if ENABLE_CONFLUENCE:
-            HTF_INTERVAL = st.selectbox("Higher Timeframe (HTF)", ["1wk", "1mo", "3mo", "6mo"], index=1)
-            LTF_INTERVAL = st.selectbox("Lower Timeframe (LTF)", ["1d", "1wk", "1mo"], index=0)
+            HTF_INTERVAL = st.selectbox("Higher Timeframe (HTF)", ["1h", "4h", "1d", "1wk", "1mo", "3mo", "6mo"], index=4)
+            LTF_INTERVAL = st.selectbox("Lower Timeframe (LTF)", ["5m", "15m", "75m", "1h", "1d", "1wk", "1mo"], index=4)
             with st.expander("📊 HTF Settings"):
                 ENGINE_BASE_MODE_HTF = "exact" if st.radio("HTF Base Mode", ["Up to (≤)", "Exactly (=)"], key="htf_bm") == "Exactly (=)" else "upto"
                 HTF_BASE_COUNT = st.number_input("HTF Base Count", 1, 6, 3, key="htf_bc")
@@ -146,7 +156,7 @@ def render_scanner():
                 HTF_ZONE_STATUS = st.selectbox("HTF Status", ["Fresh Only", "Tested (Up to 1 time)", "Tested (Up to 2 times)"], key="htf_zs")
                 HTF_ENABLE_ENTRY_FILTER = st.toggle("HTF Entry Filter", True, key="htf_ef")
                 HTF_BUFFER = st.slider("HTF Price Distance", 0, 20, 15, key="htf_buf", disabled=not HTF_ENABLE_ENTRY_FILTER)
-                HTF_PATTERN = st.selectbox("HTF Pattern", ["RBR", "DBR", "Both"], 2, key="htf_pat")
+                HTF_PATTERN = st.selectbox("HTF Pattern", ["RBR", "DBR", "Both", "RBD", "DBD", "Supply", "All"], 2, key="htf_pat")
                 HTF_MARKING_TYPE = st.selectbox("HTF Marking", ["Wick to Wick", "Body to Wick"], 0, key="htf_mark")
                 HTF_LEGIN_THRESH = st.slider("HTF Leg-In %", 40, 95, 55, key="htf_li")
                 HTF_LEGOUT_THRESH = st.slider("HTF Leg-Out %", 40, 95, 65, key="htf_lo")
@@ -160,14 +170,14 @@ def render_scanner():
                 LTF_ZONE_STATUS = st.selectbox("LTF Status", ["Fresh Only", "Tested (Up to 1 time)", "Tested (Up to 2 times)"], key="ltf_zs")
                 LTF_ENABLE_ENTRY_FILTER = st.toggle("LTF Entry Filter", True, key="ltf_ef")
                 LTF_BUFFER = st.slider("LTF Price Distance", 0, 20, 15, key="ltf_buf", disabled=not LTF_ENABLE_ENTRY_FILTER)
-                LTF_PATTERN = st.selectbox("LTF Pattern", ["RBR", "DBR", "Both"], 2, key="ltf_pat")
+                LTF_PATTERN = st.selectbox("LTF Pattern", ["RBR", "DBR", "Both", "RBD", "DBD", "Supply", "All"], 2, key="ltf_pat")
                 LTF_MARKING_TYPE = st.selectbox("LTF Marking", ["Wick to Wick", "Body to Wick"], 0, key="ltf_mark")
                 LTF_LEGIN_THRESH = st.slider("LTF Leg-In %", 40, 95, 55, key="ltf_li")
                 LTF_LEGOUT_THRESH = st.slider("LTF Leg-Out %", 40, 95, 65, key="ltf_lo")
                 LTF_BS_THRESH = st.slider("LTF Base Body %", 5, 50, 35, key="ltf_bst")
                 LTF_STRICT_MODE = st.toggle("LTF Strict Breakout", True, key="ltf_sm")
         else:
-            INTERVAL = st.selectbox("⏱️ Time Frame", ["1d", "1wk", "1mo", "3mo", "6mo"], 0)
+            INTERVAL = st.selectbox("⏱️ Time Frame", ["5m", "15m", "75m", "1h", "4h", "1d", "1wk", "1mo", "3mo", "6mo"], 5)
             BASE_UI_MODE = st.radio("Base Mode", ["Up to (≤)", "Exactly (=)"], horizontal=True)
             ENGINE_BASE_MODE = "exact" if BASE_UI_MODE == "Exactly (=)" else "upto"
             BASE_COUNT = st.number_input("Base Candle Count", 1, 6, 3)
@@ -178,7 +188,7 @@ def render_scanner():
             ENABLE_ENTRY_FILTER = st.toggle("Entry Barrier Filter", True)
             BUFFER = st.slider("Price Distance", 0, 20, 15, disabled=not ENABLE_ENTRY_FILTER)
             with st.expander("⚙️ Advanced"):
-                PATTERN = st.selectbox("Pattern", ["RBR", "DBR", "Both"], 2)
+                PATTERN = st.selectbox("Pattern", ["RBR", "DBR", "Both", "RBD", "DBD", "Supply", "All"], 2)
                 MARKING_TYPE = st.selectbox("Marking Type", ["Wick to Wick", "Body to Wick"], 0)
                 LEGIN_THRESH = st.slider("Leg-In Exciting %", 40, 95, 55)
                 LEGOUT_THRESH = st.slider("Leg-Out Exciting %", 40, 95, 65)
@@ -193,8 +203,16 @@ def render_scanner():
             ENGINE_LEGOUT_MODE_HTF = ENGINE_LEGOUT_MODE_LTF = ENGINE_LEGOUT_MODE; HTF_ENABLE_ENTRY_FILTER = LTF_ENABLE_ENTRY_FILTER = ENABLE_ENTRY_FILTER
             HTF_ZONE_STATUS = LTF_ZONE_STATUS = ZONE_STATUS; HTF_MARKING_TYPE = LTF_MARKING_TYPE = MARKING_TYPE
 
+        with st.expander("🧹 Universe Prefilter", expanded=False):
+            MIN_PRICE = st.number_input("Min Price (0 = off)", min_value=0.0, value=0.0)
+            MIN_TURNOVER = st.number_input("Min Avg Turnover ₹ (0 = off)", min_value=0.0, value=0.0, step=1e7)
+        PREFILTER = {"min_price": MIN_PRICE or None, "min_turnover": MIN_TURNOVER or None}
+
         run_btn = st.button("🔍 Scan Now", use_container_width=True, type="primary")
 
+    # Every scan_stock parameter after TICKER/PERIOD; also the result store key
+    scan_params = (HTF_INTERVAL, HTF_PATTERN, HTF_BASE_COUNT, HTF_LEGOUT_COUNT, HTF_LEGIN_THRESH, HTF_LEGOUT_THRESH, HTF_BS_THRESH, HTF_STRICT_MODE, HTF_BUFFER, ENGINE_BASE_MODE_HTF, ENGINE_LEGOUT_MODE_HTF, HTF_ENABLE_ENTRY_FILTER, HTF_ZONE_STATUS, HTF_MARKING_TYPE, LTF_INTERVAL, LTF_PATTERN, LTF_BASE_COUNT, LTF_LEGOUT_COUNT, LTF_LEGIN_THRESH, LTF_LEGOUT_THRESH, LTF_BS_THRESH, LTF_STRICT_MODE, LTF_BUFFER, ENGINE_BASE_MODE_LTF, ENGINE_LEGOUT_MODE_LTF, LTF_ENABLE_ENTRY_FILTER, LTF_ZONE_STATUS, LTF_MARKING_TYPE, ENABLE_CONFLUENCE)
+
     if st.button("🏠 Back to Dashboard"):
         st.session_state.view = "landing"
         st.rerun()
@@ -203,16 +221,18 @@ def render_scanner():
     if run_btn:
         findings, status_text, bar = [], st.empty(), st.progress(0)
         total_tickers = len(selected_tickers)
-        for i, ticker in enumerate(selected_tickers):
-            status_text.markdown(f"**🔍 Scanning {ticker.replace('.NS','')}** ({i+1}/{total_tickers})")
-            stock_df, result, error = scan_stock(ticker, PERIOD, HTF_INTERVAL, HTF_PATTERN, HTF_BASE_COUNT, HTF_LEGOUT_COUNT, HTF_LEGIN_THRESH, HTF_LEGOUT_THRESH, HTF_BS_THRESH, HTF_STRICT_MODE, HTF_BUFFER, ENGINE_BASE_MODE_HTF, ENGINE_LEGOUT_MODE_HTF, HTF_ENABLE_ENTRY_FILTER, HTF_ZONE_STATUS, HTF_MARKING_TYPE, LTF_INTERVAL, LTF_PATTERN, LTF_BASE_COUNT, LTF_LEGOUT_COUNT, LTF_LEGIN_THRESH, LTF_LEGOUT_THRESH, LTF_BS_THRESH, LTF_STRICT_MODE, LTF_BUFFER, ENGINE_BASE_MODE_LTF, ENGINE_LEGOUT_MODE_LTF, LTF_ENABLE_ENTRY_FILTER, LTF_ZONE_STATUS, LTF_MARKING_TYPE, ENABLE_CONFLUENCE)
+        st.session_state.scan_metrics = ScanMetrics()
+        scan_iter = scan_universe(selected_tickers, PERIOD, *scan_params, metrics=st.session_state.scan_metrics, prefilter=PREFILTER)
+        for i, (ticker, stock_df, result, error) in enumerate(scan_iter):
+            status_text.markdown(f"**🔍 Scanned {ticker.replace('.NS','')}** ({i+1}/{total_tickers})")
+            st.session_state.zone_store.record_scan(ticker, LTF_INTERVAL, stock_df, result)
             if error != "No Confluence Zone Found" and result is not None and not result.empty:
+                st.session_state.result_store.put((stock_df, result, error), ticker, PERIOD, *scan_params)
                 for _, p in result.iterrows():
                     row = {"Company": ticker.replace(".NS",""), "Pattern": p['Pattern_Found'], "Bases": p['Base_Count'], "LegOuts": p['LegOut_Count'], "Zone High": round(p['Zone_High'], 2), "Zone Low": round(p['Zone_Low'], 2), "Ticker": ticker, "Current Price": round(stock_df[f"Close_{ticker}"].iloc[-1], 2), "Tests": p['Tests']}
                     if ENABLE_CONFLUENCE: row["LTF Leg-In"], row["HTF Leg-In"] = p['LegIn_Date'], p.get('HTF_LegIn_Date', "N/A")
                     else: row["Leg-In Date"] = p['LegIn_Date']
                     findings.append(row)
-            time.sleep(0.05)
             bar.progress((i + 1) / total_tickers)
       
         if findings:
@@ -229,14 +249,29 @@ def render_scanner():
       
         df_res = st.session_state["scan_results"]
         c1, c2, c3, c4 = st.columns(4)
-        m_list = [("Total Zones", len(df_res), "🎯"), ("Unique Symbols", df_res['Company'].nunique(), "📊"), ("RBR Pattern", len(df_res[df_res['Pattern'] == 'Rally-Base-Rally']), "🟢"), ("DBR Pattern", len(df_res[df_res['Pattern'] == 'Drop-Base-Rally']), "🟡")]
+        counts = df_res['Pattern'].value_counts()
+        m_list = [("Total Zones", len(df_res), "🎯"), ("Unique Symbols", df_res['Company'].nunique(), "📊"), ("Demand RBR / DBR", f"{counts.get('Rally-Base-Rally', 0)} / {counts.get('Drop-Base-Rally', 0)}", "🟢"), ("Supply RBD / DBD", f"{counts.get('Rally-Base-Drop', 0)} / {counts.get('Drop-Base-Drop', 0)}", "🔴")]
         for col, (lbl, val, icon) in zip([c1, c2, c3, c4], m_list):
             col.markdown(f'<div class="metric-card"><span class="metric-lbl">{icon} {lbl}</span><div class="metric-val">{val}</div></div>', unsafe_allow_html=True)
       
-        tab1, tab2 = st.tabs(["📊 Dashboard", "📋 Raw Data"])
+        with st.expander("⏱️ Scan Metrics", expanded=False):
+            metrics = st.session_state.scan_metrics
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Wall Time", f"{metrics.wall:.1f}s")
+            m2.metric("Candidates", metrics.counters.get("candidates", 0))
+            m3.metric("Zones Kept", metrics.counters.get("zones", 0))
+            st.dataframe(metrics.stage_frame(), use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(sorted(metrics.counters.items()), columns=["Counter", "Value"]), use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(metrics.slowest(10), columns=["Ticker", "Seconds"]), use_container_width=True, hide_index=True)
+
+        tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "📋 Raw Data", "🗄️ Saved Zones"])
         with tab2:
             display_cols = ["Company", "Pattern", "Bases", "Zone High", "Zone Low", "LTF Leg-In", "HTF Leg-In", "Current Price", "Tests"] if ENABLE_CONFLUENCE else ["Company", "Pattern", "Bases", "Zone High", "Zone Low", "Leg-In Date", "Current Price", "Tests"]
             st.dataframe(df_res[display_cols], use_container_width=True, hide_index=True)
+        with tab3:
+            near_pct = st.number_input("Within % of Price", min_value=0.5, max_value=50.0, value=5.0, step=0.5)
+            near_status = st.multiselect("Zone Status", ["fresh", "tested", "broken"], default=["fresh"])
+            if near_status: st.dataframe(st.session_state.zone_store.near_price(near_pct, near_status), use_container_width=True, hide_index=True)
       
         with tab1:
             ticker_list = df_res["Ticker"].unique().tolist()
@@ -247,7 +282,7 @@ def render_scanner():
                 if st.button("➡️"): st.session_state.ticker_index = (st.session_state.ticker_index + 1) % len(ticker_list); st.rerun()
             sel_tick = nav_col2.selectbox("Select", ticker_list, index=min(st.session_state.ticker_index, len(ticker_list)-1), label_visibility="collapsed")
           
-            stock, result, error = scan_stock(sel_tick, PERIOD, HTF_INTERVAL, HTF_PATTERN, HTF_BASE_COUNT, HTF_LEGOUT_COUNT, HTF_LEGIN_THRESH, HTF_LEGOUT_THRESH, HTF_BS_THRESH, HTF_STRICT_MODE, HTF_BUFFER, ENGINE_BASE_MODE_HTF, ENGINE_LEGOUT_MODE_HTF, HTF_ENABLE_ENTRY_FILTER, HTF_ZONE_STATUS, HTF_MARKING_TYPE, LTF_INTERVAL, LTF_PATTERN, LTF_BASE_COUNT, LTF_LEGOUT_COUNT, LTF_LEGIN_THRESH, LTF_LEGOUT_THRESH, LTF_BS_THRESH, LTF_STRICT_MODE, LTF_BUFFER, ENGINE_BASE_MODE_LTF, ENGINE_LEGOUT_MODE_LTF, LTF_ENABLE_ENTRY_FILTER, LTF_ZONE_STATUS, LTF_MARKING_TYPE, ENABLE_CONFLUENCE)
+            stock, result, error = st.session_state.result_store.scan(sel_tick, PERIOD, *scan_params)
           
             if stock is not None:
                 last = stock[f"Close_{sel_tick}"].iloc[-1]
@@ -265,7 +300,8 @@ def render_scanner():
                 if result is not None:
                     res_clean = result.sort_values('LegOut_Count', ascending=False).drop_duplicates(subset=['Pattern_Found', 'Zone_High', 'Zone_Low'])
                     for _, p in res_clean.iterrows():
-                        fig.add_shape(type="rect", x0=p['LegIn_Date'], x1=stock.index[-1], y0=p['Zone_Low'], y1=p['Zone_High'], fillcolor="rgba(102, 126, 234, 0.15)", line=dict(color="#667eea", width=2, dash="dash"))
+                        fill, border = ZONE_COLORS[p.get('Zone_Type', 'Demand')]
+                        fig.add_shape(type="rect", x0=p['LegIn_Date'], x1=stock.index[-1], y0=p['Zone_Low'], y1=p['Zone_High'], fillcolor=fill, line=dict(color=border, width=2, dash="dash"))
               
                 fig.update_layout(
                     height=650, margin=dict(t=0, b=0, l=0, r=0),
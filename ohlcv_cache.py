@@ -0,0 +1,81 @@
+import os
+import re
+import pandas as pd
+
+CACHE_DIR = os.environ.get("ZONE_CACHE_DIR", ".zone_cache")
+# NSE cash session: cached bars only go stale while it is open
+SESSION_TZ = "Asia/Kolkata"
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_CLOSE = pd.Timedelta(hours=15, minutes=30)
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+def cache_path(TICKER, INTERVAL):
+    return os.path.join(CACHE_DIR, INTERVAL, f"{TICKER}.parquet")
+
+def load(TICKER, INTERVAL):
+    """Returns the cached raw history, or None when nothing is stored yet."""
+    path = cache_path(TICKER, INTERVAL)
+    if not os.path.exists(path): return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+def save(TICKER, INTERVAL, stock):
+    """Writes atomically so parallel scans never read a half-written file."""
+    path = cache_path(TICKER, INTERVAL)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    stock.to_parquet(tmp)
+    os.replace(tmp, path)
+
+def last_close(now=None):
+    """Most recent weekday session close at or before now, or None while a session is open."""
+    now = pd.Timestamp.now(tz=SESSION_TZ) if now is None else pd.Timestamp(now).tz_convert(SESSION_TZ)
+    day = now.normalize()
+    if day.dayofweek < 5 and day + SESSION_OPEN <= now < day + SESSION_CLOSE: return None
+    close = day + SESSION_CLOSE if now >= day + SESSION_CLOSE else day - pd.Timedelta(days=1) + SESSION_CLOSE
+    while close.dayofweek >= 5: close -= pd.Timedelta(days=1)
+    return close
+
+def is_fresh(TICKER, INTERVAL, now=None):
+    """
+    A cached history is fresh when it was written after the last session close and no session
+    is open since; during market hours every cached ticker is stale and gets its top-up.
+    """
+    path = cache_path(TICKER, INTERVAL)
+    close = last_close(now)
+    return close is not None and os.path.exists(path) and os.path.getmtime(path) >= close.timestamp()
+
+def merge(cached, new):
+    """Appends freshly fetched bars; the re-fetched last bar replaces the cached (partial) one."""
+    if new is None or new.empty: return cached
+    if cached is None or cached.empty: return new
+    new = new.reindex(columns=cached.columns.union(new.columns, sort=False))
+    combined = pd.concat([cached, new])
+    return combined[~combined.index.duplicated(keep='last')].sort_index()
+
+def period_start(PERIOD, INTERVAL, end=None):
+    """Start timestamp yfinance would use for PERIOD, floored to the bar containing it. None for "max"."""
+    PERIOD = PERIOD.lower()
+    end = pd.Timestamp.now().normalize() if end is None else end
+    if PERIOD == "max": return None
+    if PERIOD == "ytd": return pd.Timestamp(year=end.year, month=1, day=1)
+    match = _PERIOD_RE.match(PERIOD)
+    if not match: raise ValueError(f"Unsupported period: {PERIOD}")
+    n, unit = int(match.group(1)), match.group(2)
+    offset = {"d": pd.DateOffset(days=n), "wk": pd.DateOffset(weeks=n),
+              "mo": pd.DateOffset(months=n), "y": pd.DateOffset(years=n)}[unit]
+    start = end - offset
+    if INTERVAL == "1wk": start = start - pd.Timedelta(days=start.dayofweek)
+    elif INTERVAL in ("1m", "1mo", "3m", "3mo", "6m", "6mo"): start = start.replace(day=1)
+    return start
+
+def slice_period(stock, PERIOD, INTERVAL):
+    """Cuts a full cached history down to the requested lookback."""
+    if stock is None: return pd.DataFrame()
+    start = period_start(PERIOD, INTERVAL)
+    if start is None or stock.empty: return stock.copy()
+    if stock.index.tz is not None: start = start.tz_localize(stock.index.tz)
+    return stock[stock.index >= start].copy()
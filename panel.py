@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from scanner import get_multi_timeframe_data_batch, find_demand_zones_arrays, BATCH_SIZE, _stage, _count
+
+PANEL_DIR = os.environ.get("ZONE_PANEL_DIR", ".zone_panel")
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+def panel_path(name, INTERVAL):
+    return os.path.join(PANEL_DIR, INTERVAL, name)
+
+def _field_file(path, field):
+    return os.path.join(path, f"{field}.f8")
+
+def write_panel(path, frames, INTERVAL=None):
+    """
+    Streams (ticker, frame) pairs into a columnar panel directory: one contiguous float64 file per
+    field (all tickers back to back), Time.i8 with UTC nanoseconds, and index.json holding the
+    ticker order and row offsets. Only one frame is held at a time, so a full-market build stays flat.
+    Written beside `path` and swapped in, so open panels never see a half-written one.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp): shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    handles = {field: open(_field_file(tmp, field), "wb") for field in FIELDS}
+    handles["Time"] = open(os.path.join(tmp, "Time.i8"), "wb")
+    tickers, offsets, tz = [], [0], None
+    try:
+        for ticker, stock in frames:
+            if stock is None or stock.empty: continue
+            index = pd.DatetimeIndex(stock.index)
+            if tz is None and index.tz is not None: tz = str(index.tz)
+            for field in FIELDS:
+                values = stock[field] if field in stock else pd.Series(np.nan, index=stock.index)
+                values.to_numpy(dtype=np.float64).tofile(handles[field])
+            index.as_unit("ns").asi8.astype(np.int64).tofile(handles["Time"])
+            tickers.append(ticker)
+            offsets.append(offsets[-1] + len(stock))
+    finally:
+        for fh in handles.values(): fh.close()
+    with open(os.path.join(tmp, "index.json"), "w") as fh:
+        json.dump({"interval": INTERVAL, "tz": tz, "tickers": tickers, "offsets": offsets,
+                   "built": pd.Timestamp.now().isoformat(timespec="seconds")}, fh)
+    if os.path.exists(path): shutil.rmtree(path)
+    os.replace(tmp, path)
+    return path
+
+def build_panel(TICKERS, PERIOD, INTERVAL, path=None, name="universe", batch_size=BATCH_SIZE, use_cache=None, provider=None):
+    """Fetches TICKERS one batch at a time (through the OHLCV cache) straight into a panel on disk."""
+    path = path or panel_path(name, INTERVAL)
+    def frames():
+        for start in range(0, len(TICKERS), batch_size):
+            chunk = list(TICKERS[start:start + batch_size])
+            data = get_multi_timeframe_data_batch(chunk, PERIOD, [INTERVAL], batch_size, use_cache, provider)
+            for ticker in chunk: yield ticker, data[ticker][INTERVAL]
+    return write_panel(path, frames(), INTERVAL)
+
+def _memmap(path, dtype, rows):
+    """Read-only map of a field file; numpy cannot map an empty file."""
+    if rows == 0: return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+class OHLCVPanel:
+    """
+    Read-only, memory-mapped view of a panel written by write_panel. Per-ticker arrays are
+    slices of the maps: nothing is copied and only the pages a scan touches are read, so
+    resident memory does not grow with the universe.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as fh: meta = json.load(fh)
+        self.interval, self.tz = meta["interval"], meta["tz"]
+        self.tickers = meta["tickers"]
+        self.offsets = np.asarray(meta["offsets"], dtype=np.int64)
+        self._rows = {ticker: i for i, ticker in enumerate(self.tickers)}
+        rows = int(self.offsets[-1])
+        self.fields = {field: _memmap(_field_file(path, field), np.float64, rows) for field in FIELDS}
+        self.time = _memmap(os.path.join(path, "Time.i8"), np.int64, rows)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, TICKER):
+        return TICKER in self._rows
+
+    def _slice(self, TICKER):
+        i = self._rows[TICKER]
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def field(self, TICKER, field):
+        return self.fields[field][self._slice(TICKER)]
+
+    def _to_index(self, stamps):
+        index = pd.DatetimeIndex(np.asarray(stamps).view("datetime64[ns]"))
+        return index.tz_localize("UTC").tz_convert(self.tz) if self.tz else index
+
+    def index(self, TICKER):
+        return self._to_index(self.time[self._slice(TICKER)])
+
+    def full_index(self):
+        """Timestamps of every row, all tickers back to back."""
+        return self._to_index(self.time)
+
+    def arrays(self, TICKER):
+        """(index, open, high, low, close) - the layout find_demand_zones_arrays takes."""
+        part = self._slice(TICKER)
+        return (self.index(TICKER),) + tuple(self.fields[field][part] for field in FIELDS[:4])
+
+    def frame(self, TICKER):
+        """An ordinary (copied) OHLCV frame, for callers that still want pandas."""
+        part = self._slice(TICKER)
+        return pd.DataFrame({field: np.array(self.fields[field][part]) for field in FIELDS}, index=self.index(TICKER))
+
+def open_panel(name="universe", INTERVAL="1d", path=None):
+    return OHLCVPanel(path or panel_path(name, INTERVAL))
+
+def detect_universe(panel, **settings):
+    """
+    Zones for every ticker of the panel from one cross-sectional pass over the mapped arrays
+    (see find_demand_zones_arrays' offsets). Rows carry a Ticker column; None when nothing is found.
+    """
+    if len(panel) == 0: return None
+    with _stage("panel_slice"):
+        index = panel.full_index()
+    _count("panel_tickers", len(panel))
+    return find_demand_zones_arrays(index, *(panel.fields[field] for field in FIELDS[:4]), panel.tickers,
+                                    offsets=panel.offsets, **settings)
+
+def detect_frames(frames, **settings):
+    """detect_universe for in-memory {ticker: frame} data (e.g. get_resampled_data_batch output)."""
+    frames = {ticker: stock for ticker, stock in frames.items() if stock is not None and not stock.empty}
+    if not frames: return None
+    stacked = pd.concat(frames.values())
+    offsets = np.cumsum([0] + [len(stock) for stock in frames.values()])
+    return find_demand_zones_arrays(stacked.index, *(stacked[field].to_numpy(dtype=float) for field in FIELDS[:4]),
+                                    list(frames), offsets=offsets, **settings)
+
+def scan_panel(panel, TICKERS=None, **settings):
+    """
+    Yields (ticker, result) running find_demand_zones_arrays over each ticker's zero-copy slice.
+    settings are find_demand_zones' arguments after TICKER.
+    """
+    for ticker in (panel.tickers if TICKERS is None else TICKERS):
+        if ticker not in panel: continue
+        with _stage("panel_slice"):
+            index, op, hi, lo, cl = panel.arrays(ticker)
+        _count("panel_tickers")
+        yield ticker, find_demand_zones_arrays(index, op, hi, lo, cl, ticker, **settings)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import ohlcv_cache
+import providers
+import scanner
+from scanner import BATCH_SIZE, _stage, _count
+
+SNAPSHOT_PERIOD = "1mo"  # daily bars fetched for tickers with no fresh cache
+SNAPSHOT_BARS = 20       # trading days the summary covers
+SNAPSHOT_COLUMNS = ['Last_Close', 'Range_Pct', 'Avg_Volume', 'Avg_Turnover', 'Bars']
+
+# threshold -> (snapshot column, passes(value, limit), label)
+THRESHOLDS = {
+    "min_price": ('Last_Close', np.greater_equal, "price"),
+    "max_price": ('Last_Close', np.less_equal, "price"),
+    "min_avg_volume": ('Avg_Volume', np.greater_equal, "avg volume"),
+    "min_turnover": ('Avg_Turnover', np.greater_equal, "avg turnover"),
+    "min_range_pct": ('Range_Pct', np.greater_equal, "range %"),
+}
+
+def _summary(stock):
+    """Snapshot row from the last SNAPSHOT_BARS daily bars."""
+    if stock is None or stock.empty: return [np.nan, np.nan, np.nan, np.nan, 0]
+    tail = stock.tail(SNAPSHOT_BARS)
+    close = tail['Close'].to_numpy(dtype=float)
+    volume = tail['Volume'].to_numpy(dtype=float) if 'Volume' in tail else np.full(len(tail), np.nan)
+    last = close[-1]
+    range_pct = (tail['High'].max() - tail['Low'].min()) / last * 100 if last else np.nan
+    return [last, range_pct, np.nanmean(volume), np.nanmean(volume * close), len(tail)]
+
+def snapshot(TICKERS, use_cache=None, provider=None, batch_size=BATCH_SIZE):
+    """
+    Cheap per-ticker summary (last close, recent high-low range, average volume and turnover).
+    Read from the daily OHLCV cache where it is fresh (see ohlcv_cache.is_fresh); the rest come
+    from short SNAPSHOT_PERIOD downloads, not the full history a scan needs.
+    """
+    use_cache = scanner.USE_CACHE if use_cache is None else use_cache
+    provider = provider or providers.DEFAULT_PROVIDER
+    rows, missing = {}, []
+    for ticker in TICKERS:
+        cached = ohlcv_cache.load(ticker, "1d") if use_cache and ohlcv_cache.is_fresh(ticker, "1d") else None
+        if cached is None or cached.empty: missing.append(ticker)
+        else: rows[ticker] = _summary(cached)
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start:start + batch_size]
+        with _stage("download"): fetched = provider.fetch(chunk, "1d", period=SNAPSHOT_PERIOD)
+        for ticker in chunk: rows[ticker] = _summary(fetched.get(ticker))
+    return pd.DataFrame.from_dict(rows, orient='index', columns=SNAPSHOT_COLUMNS).reindex(TICKERS)
+
+def prefilter(TICKERS, snap=None, use_cache=None, provider=None, **thresholds):
+    """
+    Prunes TICKERS before the full fetch and detection. thresholds are any of THRESHOLDS
+    (None or missing = not applied). Returns (kept tickers, {ticker: reason}).
+    """
+    thresholds = {name: limit for name, limit in thresholds.items() if limit is not None}
+    unknown = set(thresholds) - set(THRESHOLDS)
+    if unknown: raise ValueError(f"Unknown prefilter threshold(s): {', '.join(sorted(unknown))}")
+    if not thresholds: return list(TICKERS), {}
+    with _stage("prefilter"):
+        snap = snapshot(TICKERS, use_cache, provider) if snap is None else snap
+        reasons = pd.Series(np.where(snap['Bars'].fillna(0).to_numpy() > 0, None, "no recent data"), index=snap.index, dtype=object)
+        for name, limit in thresholds.items():
+            column, passes, label = THRESHOLDS[name]
+            values = snap[column].to_numpy(dtype=float)
+            failed = reasons.isna().to_numpy() & ~passes(values, limit)
+            reasons[failed] = [f"{label} {value:,.2f} {'<' if name.startswith('min') else '>'} {limit:,}" for value in values[failed]]
+    rejected = reasons.dropna().to_dict()
+    _count("rejected_prefilter", len(rejected))
+    return [ticker for ticker in TICKERS if ticker not in rejected], rejected
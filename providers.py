@@ -0,0 +1,93 @@
+import yfinance as yf
+from yfinance import multi as yf_multi
+from yfinance.exceptions import YFRateLimitError
+import pandas as pd
+import ohlcv_cache
+
+# yfinance reports a throttled symbol as an exception or, when it hides exceptions, a logged message
+RATE_LIMIT_MARKERS = ("YFRateLimitError", "Too Many Requests", "Rate limited")
+
+class ProviderError(Exception):
+    """A whole batch failed; raised so the fetch layer retries it."""
+
+class DataProvider:
+    """
+    Source of raw OHLCV bars.
+    fetch() returns {ticker: frame} with flat Open/High/Low/Close/Volume columns; empty frame when unavailable.
+    Transient failures (throttling) should raise so callers can retry.
+    """
+    def fetch(self, TICKERS, INTERVAL, period=None, start=None):
+        raise NotImplementedError
+
+def _split_ticker(raw, TICKER):
+    """Extracts one symbol from a grouped multi-ticker download."""
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return raw.copy()
+    if TICKER in raw.columns.get_level_values(0):
+        stock = raw[TICKER]
+    elif TICKER in raw.columns.get_level_values(-1):
+        stock = raw.xs(TICKER, axis=1, level=-1)
+    else:
+        return pd.DataFrame()
+    return stock.dropna(how='all').copy()
+
+def _download(TICKERS, INTERVAL, params):
+    """
+    Grouped yf.download returning (raw, {symbol: error}, {symbol: traceback}). yf.download only
+    logs per-symbol failures, so it is run on a download context of our own to read them.
+    Each call gets its own context (yfinance >= 1.x), so batches can download concurrently.
+    """
+    kwargs = dict(interval=INTERVAL, group_by="ticker", threads=True, progress=False, auto_adjust=False, actions=False, **params)
+    ctx_type = getattr(yf_multi, "_DownloadCtx", None)
+    if ctx_type is None: return yf.download(list(TICKERS), **kwargs), {}, {}
+    ctx = ctx_type()
+    return yf_multi._download_impl(ctx, list(TICKERS), **kwargs), ctx.errors, ctx.tracebacks
+
+class YahooProvider(DataProvider):
+    """yfinance: grouped yf.download for batches, Ticker.history for single symbols."""
+    def fetch(self, TICKERS, INTERVAL, period=None, start=None):
+        params = {"period": period} if start is None else {"start": start}
+        if len(TICKERS) == 1:
+            # Ticker.history holds no shared state, so single-symbol fetches can run concurrently
+            try:
+                stock = yf.Ticker(TICKERS[0]).history(interval=INTERVAL, auto_adjust=False, actions=False, **params)
+            except YFRateLimitError:
+                raise
+            except Exception:
+                stock = pd.DataFrame()  # same as yf.download: a failed symbol is just empty
+            if not INTERVAL.endswith(("m", "h")) and isinstance(stock.index, pd.DatetimeIndex) and stock.index.tz is not None:
+                stock.index = stock.index.tz_localize(None)
+            return {TICKERS[0]: stock}
+        raw, errors, tracebacks = _download(TICKERS, INTERVAL, params)
+        if any(marker in str(error) for error in errors.values() for marker in RATE_LIMIT_MARKERS): raise YFRateLimitError()
+        frames = {ticker: _split_ticker(raw, ticker) for ticker in TICKERS}
+        # Symbols with no bars are normal (delisted, nothing new); every symbol raising is not
+        if tracebacks and all(stock.empty for stock in frames.values()):
+            raise ProviderError(f"All {len(TICKERS)} symbols failed: {next(iter(errors.values()))}")
+        return frames
+
+class FrameProvider(DataProvider):
+    """Local stand-in serving in-memory frames, {ticker: frame} or {ticker: {interval: frame}}."""
+    def __init__(self, frames):
+        self.frames = frames
+
+    def fetch(self, TICKERS, INTERVAL, period=None, start=None):
+        out = {}
+        for ticker in TICKERS:
+            stock = self.frames.get(ticker, pd.DataFrame())
+            if isinstance(stock, dict): stock = stock.get(INTERVAL, pd.DataFrame())
+            if start is not None:
+                start_ts = pd.Timestamp(start)
+                if getattr(stock.index, "tz", None) is not None: start_ts = start_ts.tz_localize(stock.index.tz)
+                stock = stock[stock.index >= start_ts].copy()
+            else:
+                stock = ohlcv_cache.slice_period(stock, period or "max", INTERVAL)
+            out[ticker] = stock
+        return out
+
+DEFAULT_PROVIDER = YahooProvider()
+
+def set_default_provider(provider):
+    """Swaps the provider used by every fetch that does not pass one explicitly."""
+    global DEFAULT_PROVIDER
+    DEFAULT_PROVIDER = provider
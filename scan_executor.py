@@ -0,0 +1,83 @@
+import os
+import inspect
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from scanner import scan_stock, BATCH_SIZE, ScanMetrics, collect_metrics
+from async_fetch import AsyncFetcher
+from prefilter import prefilter as prefilter_universe
+
+SCAN_WORKERS = int(os.environ.get("ZONE_SCAN_WORKERS", os.cpu_count() or 1))
+FETCH_WORKERS = 4
+# Workers must not be forked from a process already running fetch and UI threads (held locks can
+# deadlock the child); forkserver forks them from a clean single-threaded server instead
+SCAN_CONTEXT = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+def _scan_intervals(PERIOD, scan_args, scan_kwargs):
+    """Intervals scan_stock will need, read from its own signature so positional calls stay valid."""
+    bound = inspect.signature(scan_stock).bind(None, PERIOD, *scan_args, **scan_kwargs)
+    bound.apply_defaults()
+    params = bound.arguments
+    if params['enable_confluence']:
+        return list(dict.fromkeys([params['htf_interval'], params['ltf_interval']]))
+    return [params['ltf_interval']]
+
+def _scan_one(TICKER, PERIOD, scan_args, scan_kwargs, data):
+    """scan_stock in a worker; its own ScanMetrics travels back with the result."""
+    metrics, start = ScanMetrics(), time.perf_counter()
+    try:
+        with collect_metrics(metrics):
+            row = (TICKER,) + tuple(scan_stock(TICKER, PERIOD, *scan_args, data=data, **scan_kwargs))
+    except Exception as exc:
+        row = TICKER, None, None, f"Scan failed: {exc}"
+        metrics.count("scan_failed")
+    metrics.add_ticker(TICKER, time.perf_counter() - start)
+    return row, metrics
+
+def scan_universe(TICKERS, PERIOD, *scan_args, max_workers=None, fetch_workers=FETCH_WORKERS,
+                  batch_size=BATCH_SIZE, use_cache=None, metrics=None, prefilter=None, **scan_kwargs):
+    """
+    Parallel scan_stock over a ticker list.
+    Batched downloads go through an AsyncFetcher (fetch_workers batches in flight, rate-limited
+    and retried) and zone detection runs on a process pool. Yields
+    (ticker, stock, result, error) in completion order, so callers can update live.
+    Pass a ScanMetrics as `metrics` to collect stage timings and counters from every worker.
+    prefilter ({threshold: value}, see prefilter.THRESHOLDS) drops tickers on a cheap snapshot
+    first; they are yielded straight away with a "Skipped: ..." error.
+    Workers start from SCAN_CONTEXT (forkserver/spawn), so a calling script needs the usual
+    `if __name__ == "__main__":` guard.
+    """
+    intervals = _scan_intervals(PERIOD, scan_args, scan_kwargs)
+    started = time.perf_counter()
+    if prefilter:
+        with collect_metrics(metrics):
+            TICKERS, rejected = prefilter_universe(TICKERS, use_cache=use_cache, **prefilter)
+        for ticker, reason in rejected.items(): yield ticker, None, None, f"Skipped: {reason}"
+    chunks = [list(TICKERS[i:i + batch_size]) for i in range(0, len(TICKERS), batch_size)]
+    fetcher = AsyncFetcher(concurrency=fetch_workers, use_cache=use_cache, batch_size=batch_size).start()
+    scan_pool = ProcessPoolExecutor(max_workers=max_workers or SCAN_WORKERS, mp_context=SCAN_CONTEXT)
+    try:
+        fetching = {fetcher.submit(chunk, PERIOD, intervals, metrics): chunk for chunk in chunks}
+        scanning = set()
+        while fetching or scanning:
+            done, _ = wait(set(fetching) | scanning, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    chunk = fetching.pop(future)
+                    try:
+                        frames = future.result()
+                    except Exception as exc:
+                        for ticker in chunk: yield ticker, None, None, f"Download failed: {exc}"
+                        continue
+                    for ticker in chunk:
+                        scanning.add(scan_pool.submit(_scan_one, ticker, PERIOD, scan_args, scan_kwargs, frames[ticker]))
+                else:
+                    scanning.discard(future)
+                    row, worker_metrics = future.result()
+                    if metrics is not None: metrics.merge(worker_metrics)
+                    yield row
+    finally:
+        if metrics is not None: metrics.wall += time.perf_counter() - started
+        # A stopped Streamlit run closes this generator: drop queued work instead of waiting for it
+        fetcher.stop()
+        scan_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,50 +1,381 @@
-import yfinance as yf
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
 import pandas as pd
 import numpy as np
+import ohlcv_cache
+import providers
+import kernels
+import intraday
+from zone_index import ZoneIntervalIndex, RangeMinIndex
 
-ALLOWED_INTERVALS = {"1d", "1wk", "1mo", "3mo", "6mo"}
+ALLOWED_INTERVALS = {"1d", "1wk", "1mo", "3mo", "6mo"} | set(intraday.INTERVAL_MINUTES)
+BATCH_SIZE = 100
+USE_CACHE = True
+OHLC_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
 
-def get_resampled_data(TICKER, PERIOD, INTERVAL):
-    """Fetches RAW data and ensures resampling alignment."""
+class ScanMetrics:
+    """
+    Per-stage wall time, counters and per-ticker time for a scan.
+    Filled by the scanner while active on the current thread (collect_metrics); worker copies
+    are combined with merge(), so one object can describe a whole parallel universe scan.
+    """
+    def __init__(self):
+        self.stages = {}    # stage -> [seconds, calls]
+        self.counters = {}
+        self.tickers = {}   # ticker -> seconds in scan_stock
+        self.wall = 0.0     # elapsed time of the whole scan, set by scan_universe
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k != '_lock'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds, calls=1):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds; entry[1] += calls
+
+    def count(self, name, k=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(k)
+
+    def add_ticker(self, TICKER, seconds):
+        with self._lock:
+            self.tickers[TICKER] = self.tickers.get(TICKER, 0.0) + seconds
+
+    def merge(self, other):
+        if other is None: return self
+        for stage, (seconds, calls) in other.stages.items(): self.add_time(stage, seconds, calls)
+        for name, k in other.counters.items(): self.count(name, k)
+        for ticker, seconds in other.tickers.items(): self.add_ticker(ticker, seconds)
+        return self
+
+    def slowest(self, n=10):
+        return sorted(self.tickers.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def stage_frame(self):
+        """Stages by total time, with call counts and share of the summed stage time (workers overlap in wall time)."""
+        frame = pd.DataFrame([(stage, seconds, calls) for stage, (seconds, calls) in self.stages.items()],
+                             columns=['Stage', 'Seconds', 'Calls']).sort_values('Seconds', ascending=False)
+        frame['Share'] = frame['Seconds'] / frame['Seconds'].sum() if len(frame) else frame['Seconds']
+        return frame.reset_index(drop=True)
+
+    def as_dict(self):
+        return {"wall": self.wall, "stages": {stage: {"seconds": seconds, "calls": calls} for stage, (seconds, calls) in self.stages.items()},
+                "counters": dict(self.counters), "slowest_tickers": self.slowest()}
+
+_local = threading.local()
+
+@contextmanager
+def collect_metrics(metrics):
+    """Records scanner stages on this thread into `metrics` for the duration of the block."""
+    previous, _local.metrics = getattr(_local, 'metrics', None), metrics
+    try:
+        yield metrics
+    finally:
+        _local.metrics = previous
+
+@contextmanager
+def _stage(name):
+    metrics, start = getattr(_local, 'metrics', None), time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None: metrics.add_time(name, time.perf_counter() - start)
+
+def _count(name, k=1):
+    metrics = getattr(_local, 'metrics', None)
+    if metrics is not None: metrics.count(name, k)
+
+def _fetch_interval(INTERVAL):
+    """Maps a scan interval to the interval actually requested from Yahoo."""
     INTERVAL = INTERVAL.lower()
-    fetch_params = {"period": PERIOD, "progress": False, "auto_adjust": False, "actions": False}
-    if INTERVAL in ["1d", "1wk"]:
-        stock = yf.download(TICKER, interval=INTERVAL, **fetch_params)
-    elif INTERVAL in ["1m", "1mo"]:
-        stock = yf.download(TICKER, interval="1mo", **fetch_params)
-    else:  
-        monthly = yf.download(TICKER, interval="1mo", **fetch_params)
-        if monthly.empty: return monthly
-        if isinstance(monthly.columns, pd.MultiIndex):
-            monthly.columns = [col[0] for col in monthly.columns.values]
-        ohlc_dict = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
-        if INTERVAL in ['3m', '3mo']:
-            stock = monthly.resample('QS').agg(ohlc_dict).dropna()
-        elif INTERVAL in ['6m', '6mo']:
-            stock = monthly.resample('2QS').agg(ohlc_dict).dropna()
-        else:
-            stock = monthly
+    if INTERVAL in ["1d", "1wk"]: return INTERVAL
+    if intraday.is_intraday(INTERVAL): return intraday.FETCH_BASE[INTERVAL]
+    return "1mo"
+
+def _flatten_columns(stock):
     if isinstance(stock.columns, pd.MultiIndex):
         stock.columns = [col[0] for col in stock.columns.values]
     return stock
 
-def find_demand_zones(stock, TICKER, pattern_choice, num_bases, num_legouts,
-                     legin_threshold, legout_threshold, base_threshold,
-                     strict_mode, entry_buffer_pct, base_mode, legout_mode,
-                     enable_entry_filter, zone_status_limit, marking_type,
-                     enable_super_exciting=False, super_lookback=20):
+def _finalize_frame(raw, INTERVAL):
+    """Flattens a raw download and resamples monthly data to 3mo/6mo when needed."""
+    INTERVAL = INTERVAL.lower()
+    stock = _flatten_columns(raw)
+    if INTERVAL in ["1d", "1wk", "1m", "1mo"] or stock.empty: return stock
+    if INTERVAL in ['3m', '3mo']:
+        return stock.resample('QS').agg(OHLC_AGG).dropna()
+    if INTERVAL in ['6m', '6mo']:
+        return stock.resample('2QS').agg(OHLC_AGG).dropna()
+    return stock
+
+RESAMPLE_RULES = {'1wk': 'W-MON', '1m': 'MS', '1mo': 'MS', '3m': 'QS', '3mo': 'QS', '6m': '2QS', '6mo': '2QS'}
+
+def _base_interval(intervals):
+    """Finest interval that every requested timeframe can be built from."""
+    if all(intraday.is_intraday(iv) for iv in intervals): return intraday.base_interval(intervals)
+    fetched = {_fetch_interval(iv) for iv in intervals}
+    return fetched.pop() if len(fetched) == 1 else "1d"
+
+def _covering_start(PERIOD, intervals):
+    """Earliest bar start needed so each timeframe gets its full first bar. None for "max"."""
+    starts = [ohlcv_cache.period_start(PERIOD, iv.lower()) for iv in intervals]
+    return None if None in starts else min(starts)
+
+def _interval_groups(intervals):
+    """Intervals split into the daily and intraday feeds they are built from: {is_intraday: [interval, ...]}."""
+    groups = {}
+    for iv in intervals: groups.setdefault(intraday.is_intraday(iv), []).append(iv)
+    return groups
+
+def _cache_fresh(TICKER, intervals):
     """
-    Core zone detection logic.
-    Integrated: Super Exciting (Range >= Avg Range) & Absolute Base tracking.
+    Whether every cached feed behind intervals can be served without a top-up. The one freshness
+    check for the batch fetch and the async fetcher's throttle, so the two cannot disagree.
     """
-    if stock.empty: return stock, None
-    o, h, l, c = 'Open', 'High', 'Low', 'Close'
-    
-    # Pre-processing
-    stock[f'Open_{TICKER}'], stock[f'High_{TICKER}'] = stock[o], stock[h]
-    stock[f'Low_{TICKER}'], stock[f'Close_{TICKER}'] = stock[l], stock[c]
-    current_price = stock[c].iloc[-1]
+    return all(ohlcv_cache.is_fresh(TICKER, _base_interval(group)) for group in _interval_groups(intervals).values())
+
+def _bar_day(stamp):
+    """Session date of a cached bar, tz-naive like ohlcv_cache.period_start."""
+    return stamp.tz_localize(None).normalize() if stamp.tz is not None else stamp.normalize()
+
+def _fetch_raw_batch(TICKERS, PERIOD, INTERVAL, use_cache, provider=None, intervals=None):
+    """Raw INTERVAL history covering PERIOD for every timeframe in `intervals`, served from the disk cache where possible."""
+    provider = provider or providers.DEFAULT_PROVIDER
+    intervals = intervals or [INTERVAL]
+    PERIOD = intraday.clamp_period(PERIOD, INTERVAL)
+    start = _covering_start(PERIOD, intervals)
+    if not use_cache:
+        _count("tickers_downloaded", len(TICKERS))
+        with _stage("download"):
+            if start is None or intervals == [INTERVAL]: return provider.fetch(TICKERS, INTERVAL, period=PERIOD)
+            return provider.fetch(TICKERS, INTERVAL, start=start.strftime('%Y-%m-%d'))
+    frames, missing, stale = {}, [], []
+    with _stage("cache_read"):
+        for ticker in TICKERS:
+            cached = ohlcv_cache.load(ticker, INTERVAL)
+            if cached is None or cached.empty: missing.append(ticker); continue
+            frames[ticker] = cached
+            if not _cache_fresh(ticker, intervals): stale.append(ticker)
+    # Intraday feeds only reach back MAX_PERIOD: a cache older than that can't be topped up and is refetched whole
+    window = intraday.MAX_PERIOD.get(INTERVAL)
+    reach = ohlcv_cache.period_start(window, INTERVAL) if window else None
+    lapsed = [ticker for ticker in stale if reach is not None and _bar_day(frames[ticker].index[-1]) <= reach]
+    stale = [ticker for ticker in stale if ticker not in lapsed]
+    _count("cache_hits", len(frames) - len(stale) - len(lapsed)); _count("tickers_downloaded", len(missing) + len(lapsed))
+    _count("tickers_topped_up", len(stale))
+    if missing:
+        with _stage("download"): fetched = provider.fetch(missing, INTERVAL, period=intraday.MAX_PERIOD.get(INTERVAL, "max"))
+        with _stage("cache_write"):
+            for ticker, raw in fetched.items():
+                if not raw.empty: ohlcv_cache.save(ticker, INTERVAL, raw)
+                frames[ticker] = raw
+    if lapsed:
+        with _stage("download"): fetched = provider.fetch(lapsed, INTERVAL, period=window)
+        with _stage("cache_write"):
+            for ticker in lapsed:
+                raw = fetched.get(ticker)
+                # Failed rather than served stale: the cached bars end before anything the feed can still fill in
+                if raw is None or raw.empty: frames[ticker] = frames[ticker].iloc[:0]; continue
+                ohlcv_cache.save(ticker, INTERVAL, raw)
+                frames[ticker] = raw
+    if stale:
+        # Top-up: only bars from the oldest "last cached bar" onwards are requested
+        top_up = min(frames[ticker].index[-1] for ticker in stale)
+        with _stage("download"): fetched = provider.fetch(stale, INTERVAL, start=top_up.strftime('%Y-%m-%d'))
+        with _stage("cache_write"):
+            for ticker, raw in fetched.items():
+                # A failed top-up leaves the file (and its mtime) alone so the next scan retries it
+                if raw is None or raw.empty: continue
+                frames[ticker] = ohlcv_cache.merge(frames[ticker], raw)
+                ohlcv_cache.save(ticker, INTERVAL, frames[ticker])
+    return frames
+
+def _derive_frame(raw, PERIOD, base, INTERVAL):
+    """One timeframe from the base download; coarser bars follow yfinance boundaries (Monday weeks, calendar months)."""
+    stock = ohlcv_cache.slice_period(_flatten_columns(raw), PERIOD, INTERVAL.lower())
+    if intraday.is_intraday(INTERVAL): return intraday.resample_session(stock, INTERVAL)
+    if _fetch_interval(INTERVAL) == base or stock.empty: return _finalize_frame(stock, INTERVAL)
+    agg = {col: how for col, how in OHLC_AGG.items() if col in stock.columns}
+    return stock.resample(RESAMPLE_RULES[INTERVAL.lower()], label='left', closed='left').agg(agg).dropna()
+
+def get_multi_timeframe_data_batch(TICKERS, PERIOD, intervals, batch_size=BATCH_SIZE, use_cache=None, provider=None):
+    """
+    {ticker: {interval: frame}} from a single download of the finest interval needed.
+    Coarser timeframes are resampled locally instead of being downloaded again. Intraday
+    timeframes come from their own intraday feed (one more download when mixed with daily ones).
+    """
+    use_cache = USE_CACHE if use_cache is None else use_cache
+    intervals = list(dict.fromkeys(intervals))
+    groups = _interval_groups(intervals)
+    frames = {ticker: {} for ticker in TICKERS}
+    for start in range(0, len(TICKERS), batch_size):
+        chunk = list(TICKERS[start:start + batch_size])
+        for group in groups.values():
+            base = _base_interval(group)
+            raw = _fetch_raw_batch(chunk, PERIOD, base, use_cache, provider, group)
+            with _stage("resample"):
+                for ticker in chunk:
+                    frames[ticker].update((iv, _derive_frame(raw[ticker], PERIOD, base, iv)) for iv in group)
+    return {ticker: {iv: frames[ticker][iv] for iv in intervals} for ticker in TICKERS}
+
+def get_multi_timeframe_data(TICKER, PERIOD, intervals, use_cache=None, provider=None):
+    return get_multi_timeframe_data_batch([TICKER], PERIOD, intervals, use_cache=use_cache, provider=provider)[TICKER]
+
+def get_resampled_data(TICKER, PERIOD, INTERVAL, use_cache=None, provider=None):
+    """Fetches RAW data and ensures resampling alignment."""
+    return get_multi_timeframe_data(TICKER, PERIOD, [INTERVAL], use_cache, provider)[INTERVAL]
+
+def get_resampled_data_batch(TICKERS, PERIOD, INTERVAL, batch_size=BATCH_SIZE, use_cache=None, provider=None):
+    """Fetches many tickers in grouped requests. Returns {ticker: frame}, empty frame on failure."""
+    frames = get_multi_timeframe_data_batch(TICKERS, PERIOD, [INTERVAL], batch_size, use_cache, provider)
+    return {ticker: data[INTERVAL] for ticker, data in frames.items()}
+
+def _scan_frame(data, TICKER, PERIOD, INTERVAL):
+    """Returns a private copy of prefetched data, downloading only when it is missing."""
+    if data is not None and INTERVAL in data:
+        return data[INTERVAL].copy()
+    return get_resampled_data(TICKER, PERIOD, INTERVAL)
+
+@dataclass(slots=True)
+class Zone:
+    """One detected formation. Its candles are referenced by index range [LegIn_Idx, End_Idx], not copied."""
+    Pattern_Found: str
+    Base_Count: int
+    LegOut_Count: int
+    LegIn_Date: str
+    Zone_High: float
+    Zone_Low: float
+    Tests: int
+    Base_Max_High: float
+    Base_Min_Low: float
+    Formation_ID: str
+    LegIn_Idx: int
+    End_Idx: int
+    Zone_Type: str = "Demand"
+
+ZONE_COLUMNS = [f.name for f in fields(Zone)]
+
+# pattern_choice keys: (Pattern_Found label, Zone_Type). Demand leg-outs rally, supply leg-outs drop.
+PATTERNS = {"RBR": ("Rally-Base-Rally", "Demand"), "DBR": ("Drop-Base-Rally", "Demand"),
+            "RBD": ("Rally-Base-Drop", "Supply"), "DBD": ("Drop-Base-Drop", "Supply")}
+PATTERN_GROUPS = {"BOTH": ["RBR", "DBR"], "SUPPLY": ["RBD", "DBD"], "ALL": list(PATTERNS)}
+
+def pattern_keys(pattern_choice):
+    """PATTERNS keys selected by a pattern_choice ("RBR", "Both", "Supply", "All", ...)."""
+    choice = pattern_choice.upper()
+    return PATTERN_GROUPS.get(choice, [choice] if choice in PATTERNS else [])
+
+def zones_to_frame(zones, index=None):
+    """Result frame (one row per formation) from Zone records."""
+    return pd.DataFrame([[getattr(z, col) for col in ZONE_COLUMNS] for z in zones], columns=ZONE_COLUMNS, index=index)
+
+def frame_to_zones(result):
+    """Zone records from a find_demand_zones result frame."""
+    if result is None or result.empty: return []
+    return [Zone(*row) for row in result[ZONE_COLUMNS].itertuples(index=False, name=None)]
+
+INDEX_BLOCK_ROWS = 1 << 18  # stacked rows per RangeMinIndex on large panels; bounds its memory
+
+def _zone_tests(lows, starts, zone_lows, zone_highs, ends=None, index=None, limit=np.inf):
+    """
+    Array-based test/break evaluation for many zones at once.
+    A zone breaks at the first bar from its start whose low is below Zone_Low; every earlier
+    bar whose low reaches Zone_High is a test. ends bounds each zone's bars (its own series in a
+    ragged panel; default len(lows)). Returns (tests, break_idx), break_idx = -1 if intact.
+    Both are O(log n) descents of a RangeMinIndex over lows (pass index to reuse one built for
+    the series); tests stop counting past limit. Without one, inputs longer than INDEX_BLOCK_ROWS
+    (stacked panels) get a table per block of zones, over just the rows they reach.
+    The compiled per-zone walk in kernels is used instead when the numba backend is active.
+    """
+    n = len(lows)
+    ends = np.broadcast_to(n if ends is None else ends, np.shape(starts))
+    if kernels.get_backend() == "numba": return kernels.zone_tests(lows, starts, zone_lows, zone_highs, ends)
+    if index is None and n > INDEX_BLOCK_ROWS:
+        tests = np.zeros(len(starts), dtype=np.int64)
+        break_idx = np.full(len(starts), -1, dtype=np.int64)
+        block = np.asarray(starts) // INDEX_BLOCK_ROWS
+        for b in np.unique(block):
+            part = np.flatnonzero(block == b)
+            first, stop = int(starts[part].min()), int(ends[part].max())
+            local = RangeMinIndex(lows[first:stop], (ends[part] - starts[part]).max())
+            tests[part], brk = _zone_tests(lows[first:stop], starts[part] - first, zone_lows[part], zone_highs[part],
+                                           ends[part] - first, local, limit)
+            break_idx[part] = np.where(brk >= 0, brk + first, -1)
+        return tests, break_idx
+    index = RangeMinIndex(lows) if index is None else index
+    brk = index.first_below(starts, ends, zone_lows)
+    tests = index.count_at_most(starts, brk, zone_highs, limit)
+    return tests, np.where(brk < ends, brk, -1)
+
+def _status_limit(zone_status_limit):
+    """Maximum number of tests a zone may have for the selected status."""
+    if zone_status_limit == "Fresh Only": return 0
+    if "Up to 1 time" in zone_status_limit: return 1
+    if "Up to 2 times" in zone_status_limit: return 2
+    return np.inf
+
+def _suffix_min(values, seg_end=None):
+    """suffix[i] = lowest value from i to the end of i's series (NaN ignored); one reverse cumulative pass."""
+    values = np.where(np.isnan(values), np.inf, values)
+    if seg_end is None or seg_end[0] == len(values): return np.minimum.accumulate(values[::-1])[::-1]
+    return pd.Series(values[::-1]).groupby(seg_end[::-1], sort=False).cummin().to_numpy()[::-1]
+
+def _base_extreme(values, indices, b, func):
+    """func (np.max / np.min) over the b base candles following each leg-in index; b may vary per index."""
+    b = np.broadcast_to(b, indices.shape)
+    fill = -np.inf if func is np.max else np.inf
+    last = len(values) - 1
+    stacked = [np.where(k <= b, values[np.minimum(indices + k, last)], fill) for k in range(1, int(b.max()) + 1)]
+    return func(np.stack(stacked), axis=0)
+
+def _forward_runs(flags, limit=None):
+    """runs[i] = number of consecutive True flags starting at i, not past limit[i] (with a trailing 0 at runs[n])."""
+    flags = np.asarray(flags, dtype=bool)
+    pos = np.arange(len(flags))
+    next_false = np.minimum.accumulate(np.where(flags, len(flags), pos)[::-1])[::-1]
+    if limit is not None: next_false = np.minimum(next_false, limit)
+    return np.append(next_false - pos, 0)
+
+def _match_formations(legin, base_run, legout, exc_run, base_range, legout_range, strict_close=None, strict_high=None, limit=None):
+    """
+    Run-length pattern matcher. A match at idx needs a leg-in at idx, b base candles, a user leg-out
+    at idx+b+1 and l_o-1 standard exciting candles after it, all before limit[idx] (the end of idx's
+    series; default len(legin)). Returns (idx, b, l_o) ordered by b, l_o, idx.
+    """
+    base_range = np.asarray(list(base_range), dtype=np.int64)
+    legout_range = np.sort(np.asarray(list(legout_range), dtype=np.int64))
+    n = len(legin)
+    limit = np.full(n, n) if limit is None else limit
+    starts = np.flatnonzero(legin & (base_run[1:] >= base_range.min()))
+    found_idx, found_b = [], []
+    for b in base_range:
+        cand = starts[(base_run[starts + 1] >= b) & (starts + b + 1 < limit[starts])]
+        cand = cand[legout[cand + b + 1]]
+        if strict_close is not None:
+            cand = cand[strict_close[cand + b + 1] > strict_high[cand]]
+        found_idx.append(cand); found_b.append(np.full(len(cand), b, dtype=np.int64))
+    idx, b = np.concatenate(found_idx), np.concatenate(found_b)
     
+    # Every leg-out length up to the run of exciting candles after the first leg-out matches
+    after = idx + b + 2
+    counts = np.searchsorted(legout_range, np.where(after < limit[idx], exc_run[after], 0) + 1, side='right')
+    idx, b = np.repeat(idx, counts), np.repeat(b, counts)
+    l_o = legout_range[np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+    order = np.lexsort((idx, l_o, b))
+    return idx[order], b[order], l_o[order]
+
+def candle_features(stock, enable_super_exciting=False, super_lookback=20):
+    """Threshold-independent candle measurements (Abs_CO, Abs_HL, Body_Pct, Range_Qualified), added in place."""
+    o, h, l, c = 'Open', 'High', 'Low', 'Close'
     stock['Abs_CO'] = (stock[c] - stock[o]).abs()
     stock['Abs_HL'] = (stock[h] - stock[l]).abs()
     stock['Body_Pct'] = (stock['Abs_CO'] / stock['Abs_HL'].replace(0, 0.001)) * 100
@@ -56,89 +387,235 @@ def find_demand_zones(stock, TICKER, pattern_choice, num_bases, num_legouts,
         stock['Range_Qualified'] = stock['Abs_HL'] >= stock['Avg_Range']
     else:
         stock['Range_Qualified'] = True
+    return stock
+
+def stamp_format(stamps):
+    """LegIn_Date format: plain dates for daily and coarser bars, minutes once any bar is intraday."""
+    return '%Y-%m-%d' if len(stamps) == 0 or (stamps == stamps.normalize()).all() else '%Y-%m-%d %H:%M'
+
+def _zone_frame(index, TICKER, label_name, idx, b, l_o, zone_high, zone_low, tests, base_max_high, base_min_low, break_idx=None,
+                zone_type="Demand"):
+    """Result rows for one pattern: one row per formation, indexed by its leg-in timestamp."""
+    stamps = index[idx]
+    legin_dates = stamps.strftime(stamp_format(stamps))
+    names = TICKER[idx] if isinstance(TICKER, np.ndarray) else [TICKER] * len(idx)
+    found = pd.DataFrame({
+        'Pattern_Found': label_name, 'Base_Count': b, 'LegOut_Count': l_o, 'LegIn_Date': legin_dates,
+        'Zone_High': zone_high, 'Zone_Low': zone_low, 'Tests': tests,
+        # Store absolute values for strict confluence
+        'Base_Max_High': base_max_high, 'Base_Min_Low': base_min_low,
+        'Formation_ID': [f"{name}_{date}_{label_name}_{n}" for name, date, n in zip(names, legin_dates, b)],
+        'LegIn_Idx': idx, 'End_Idx': idx + b + l_o, 'Zone_Type': zone_type,
+    }, index=index[idx])
+    if break_idx is not None: found['Break_Idx'] = break_idx  # -1 while intact
+    return found
+
+def _ohlc_arrays(stock):
+    """(index, open, high, low, close) of a frame as float arrays."""
+    return (stock.index,) + tuple(stock[col].to_numpy(dtype=float) for col in ('Open', 'High', 'Low', 'Close'))
+
+def candle_flags(op, hi, lo, cl, legin_threshold, legout_threshold, base_threshold,
+                 enable_super_exciting=False, super_lookback=20, groups=None):
+    """
+    Array form of find_demand_zones' candle classification for callers without a DataFrame.
+    groups labels each bar's series when several are stacked, so the range average never spans two.
+    Returns (is_base, legin_green, legin_red, std_exciting, user_legout, std_exciting_red, user_legout_red).
+    """
+    abs_hl = np.abs(hi - lo)
+    body_pct = (np.abs(cl - op) / np.where(abs_hl == 0, 0.001, abs_hl)) * 100
+    if enable_super_exciting:
+        ranges = pd.Series(abs_hl)
+        rolling = ranges.rolling(window=super_lookback) if groups is None else ranges.groupby(groups, sort=False).rolling(window=super_lookback)
+        qualified = abs_hl >= rolling.mean().to_numpy()
+    else:
+        qualified = np.ones(len(op), dtype=bool)
+    green, red = (op < cl) & qualified, (op > cl) & qualified
+    legin, exciting, legout = body_pct >= legin_threshold, body_pct >= 50, body_pct >= legout_threshold
+    return (body_pct <= base_threshold, legin & green, legin & red,
+            exciting & green, legout & green, exciting & red, legout & red)
+
+def _detect_zones(arrays, TICKER, pattern_choice, is_base, legin_green, legin_red, std_exciting, user_legout,
+                  std_exciting_red, user_legout_red, base_range, legout_range, strict_mode, entry_buffer_pct, enable_entry_filter, max_tests, marking_type,
+                  include_broken=False, seg_end=None):
+    """
+    Formation matching, zone bounds, tests and filters over precomputed candle flag arrays; arrays = _ohlc_arrays().
+    For several series stacked back to back, seg_end[i] is the end of bar i's series and TICKER an array of
+    per-bar names; formations, tests and the current price then stay within each series.
+    Supply patterns mirror demand: red leg-outs, strict close below the leg-in low, zones broken by a high above
+    Zone_High, and an entry band below the leg-out open. Both sides share one set of flags and runs.
+    """
+    index, op, hi, lo, cl = arrays
+    seg_end = np.full(len(cl), len(cl)) if seg_end is None else seg_end
+    current_price = cl[seg_end - 1]
+    keys = pattern_keys(pattern_choice)
+    base_run = _forward_runs(is_base, seg_end)
+    exc_run = _forward_runs(std_exciting, seg_end)
+    exc_run_red = _forward_runs(std_exciting_red, seg_end) if any(PATTERNS[k][1] == "Supply" for k in keys) else None
+    # Supply zones are demand zones of the negated highs. Per side and on first use: O(n) suffix minima
+    # for the status filter, and the O(n log n) range-min index only once tests are actually counted
+    test_lows, floors, indexes = {"Demand": lo, "Supply": -hi}, {}, {}
+
+    def find_patterns(legin, label_name, zone_type):
+        buffer_multiplier = 1 + (entry_buffer_pct / 100)
+        supply = zone_type == "Supply"
+        with _stage("match"):
+            if supply:
+                # Mirrored strict check: leg-out close below the leg-in low
+                indices, bases, legouts = _match_formations(legin, base_run, user_legout_red, exc_run_red, base_range, legout_range,
+                                                            -cl if strict_mode else None, -lo, seg_end)
+            else:
+                indices, bases, legouts = _match_formations(legin, base_run, user_legout, exc_run,
+                                                            base_range, legout_range, cl if strict_mode else None, hi, seg_end)
+        _count("candidates", len(indices))
+        if len(indices) == 0: return None
+        
+        # Cheapest filters first; each rejection is counted against the first filter that drops the zone
+        if enable_entry_filter:
+            # O(1) per candidate: only the leg-out open and the current price are needed
+            zone_entry, price = op[indices + bases + 1], current_price[indices]
+            if supply: in_band = (price <= zone_entry) & (price >= (zone_entry * (2 - buffer_multiplier)))
+            else: in_band = (price >= zone_entry) & (price <= (zone_entry * buffer_multiplier))
+            _count("rejected_entry", len(indices) - in_band.sum())
+            indices, bases, legouts = indices[in_band], bases[in_band], legouts[in_band]
+            if len(indices) == 0: return None
+        
+        with _stage("zone_bounds"):
+            # REQUIREMENT: Capture absolute Extremes of Bases for confluence check
+            base_max_high = _base_extreme(hi, indices, bases, np.max)
+            base_min_low = _base_extreme(lo, indices, bases, np.min)
+            
+            # Capture Zone Markings for visuals
+            if supply:
+                zone_low = _base_extreme(np.minimum(op, cl), indices, bases, np.min) if marking_type == "Body to Wick" else base_min_low
+                zone_high = np.maximum(base_max_high, hi[indices + bases + 1])
+                if label_name == "Rally-Base-Drop":
+                    zone_high = np.maximum(zone_high, hi[indices])
+            else:
+                zone_high = _base_extreme(np.maximum(op, cl), indices, bases, np.max) if marking_type == "Body to Wick" else base_max_high
+                zone_low = np.minimum(base_min_low, lo[indices + bases + 1])
+                if label_name == "Drop-Base-Rally":
+                    zone_low = np.minimum(zone_low, lo[indices])
+        
+        lows = test_lows[zone_type]
+        floor_at, ceiling_at = (-zone_high, -zone_low) if supply else (zone_low, zone_high)
+        rows = np.arange(len(indices))
+        starts, ends = indices + bases + legouts + 1, seg_end[indices]
+        if not include_broken:
+            with _stage("zone_status"):
+                # O(1) per zone from the suffix minimum: broken if any later low undercuts the zone,
+                # fresh if none even reaches it
+                if zone_type not in floors: floors[zone_type] = _suffix_min(lows, seg_end)
+                floor = np.where(starts < ends, floors[zone_type][np.minimum(starts, len(lows) - 1)], np.inf)
+                intact = floor >= floor_at
+                _count("rejected_break", len(rows) - intact.sum())
+                if max_tests == 0:
+                    fresh = floor > ceiling_at
+                    _count("rejected_status", (intact & ~fresh).sum()); intact &= fresh
+                rows, starts, ends = rows[intact], starts[intact], ends[intact]
+        
+        if len(rows) == 0 or (not include_broken and max_tests == 0):
+            # Survivors (if any) are intact and untested by construction; no index or per-bar walk needed
+            test_count, break_idx = np.zeros(len(rows), dtype=np.int64), np.full(len(rows), -1, dtype=np.int64)
+        else:
+            with _stage("zone_tests"):
+                # One table per side for a single series; stacked panels are indexed a block at a time
+                if zone_type not in indexes and kernels.get_backend() != "numba" and len(lows) <= INDEX_BLOCK_ROWS:
+                    indexes[zone_type] = RangeMinIndex(lows, (seg_end - np.arange(len(lows))).max())
+                test_count, break_idx = _zone_tests(lows, starts, floor_at[rows], ceiling_at[rows], ends,
+                                                    indexes.get(zone_type), max_tests)
+            status_ok = test_count <= max_tests
+            _count("rejected_status", len(rows) - status_ok.sum())
+            rows, test_count, break_idx = rows[status_ok], test_count[status_ok], break_idx[status_ok]
+        
+        _count("zones", len(rows))
+        with _stage("build_frame"):
+            return _zone_frame(index, TICKER, label_name, indices[rows], bases[rows], legouts[rows], zone_high[rows], zone_low[rows],
+                               test_count, base_max_high[rows], base_min_low[rows], break_idx if include_broken else None,
+                               zone_type)
+
+    all_results = []
+    for key in keys:
+        label_name, zone_type = PATTERNS[key]
+        all_results.append(find_patterns(legin_green if key[0] == "R" else legin_red, label_name, zone_type))
+    all_results = [found for found in all_results if found is not None and not found.empty]
+    return pd.concat(all_results) if all_results else None
+
+def find_demand_zones(stock, TICKER, pattern_choice, num_bases, num_legouts,
+                     legin_threshold, legout_threshold, base_threshold,
+                     strict_mode, entry_buffer_pct, base_mode, legout_mode,
+                     enable_entry_filter, zone_status_limit, marking_type,
+                     enable_super_exciting=False, super_lookback=20, include_broken=False):
+    """
+    Core zone detection logic.
+    Integrated: Super Exciting (Range >= Avg Range) & Absolute Base tracking.
+    pattern_choice also takes the supply patterns ("RBD", "DBD", "Supply", "All"); Zone_Type tells them apart.
+    include_broken keeps zones whose low was later violated (Break_Idx column) for backtests.
+    """
+    if stock.empty: return stock, None
+    o, h, l, c = 'Open', 'High', 'Low', 'Close'
     
-    # Patterns
-    stock['Is_Base'] = stock['Body_Pct'] <= base_threshold
-    
-    # Leg-In/Leg-Out must now also pass Range_Qualified if enabled
-    stock['Is_Legin_Green'] = (stock['Body_Pct'] >= legin_threshold) & (stock[o] < stock[c]) & stock['Range_Qualified']
-    stock['Is_Legin_Red'] = (stock['Body_Pct'] >= legin_threshold) & (stock[o] > stock[c]) & stock['Range_Qualified']
-    stock['Is_Standard_Exciting'] = (stock['Body_Pct'] >= 50) & (stock[o] < stock[c]) & stock['Range_Qualified']
-    stock['Is_User_Legout'] = (stock['Body_Pct'] >= legout_threshold) & (stock[o] < stock[c]) & stock['Range_Qualified']
+    with _stage("features"):
+        # Pre-processing
+        stock[f'Open_{TICKER}'], stock[f'High_{TICKER}'] = stock[o], stock[h]
+        stock[f'Low_{TICKER}'], stock[f'Close_{TICKER}'] = stock[l], stock[c]
+        candle_features(stock, enable_super_exciting, super_lookback)
+        
+        # Patterns
+        stock['Is_Base'] = stock['Body_Pct'] <= base_threshold
+        
+        # Leg-In/Leg-Out must now also pass Range_Qualified if enabled
+        stock['Is_Legin_Green'] = (stock['Body_Pct'] >= legin_threshold) & (stock[o] < stock[c]) & stock['Range_Qualified']
+        stock['Is_Legin_Red'] = (stock['Body_Pct'] >= legin_threshold) & (stock[o] > stock[c]) & stock['Range_Qualified']
+        stock['Is_Standard_Exciting'] = (stock['Body_Pct'] >= 50) & (stock[o] < stock[c]) & stock['Range_Qualified']
+        stock['Is_User_Legout'] = (stock['Body_Pct'] >= legout_threshold) & (stock[o] < stock[c]) & stock['Range_Qualified']
+        # Supply side: the same leg-outs drawn by red candles
+        stock['Is_Standard_Exciting_Red'] = (stock['Body_Pct'] >= 50) & (stock[o] > stock[c]) & stock['Range_Qualified']
+        stock['Is_User_Legout_Red'] = (stock['Body_Pct'] >= legout_threshold) & (stock[o] > stock[c]) & stock['Range_Qualified']
     
     base_range = [num_bases] if base_mode == "exact" else range(1, num_bases + 1)
     legout_range = [num_legouts] if legout_mode == "exact" else range(1, num_legouts + 1)
 
-    def find_patterns(legin_col, label_name):
-        all_found = []
-        buffer_multiplier = 1 + (entry_buffer_pct / 100)
-        for b in base_range:
-            for l_o in legout_range:
-                mask = (stock[legin_col] == True)
-                for i in range(1, b + 1):
-                    mask &= (stock['Is_Base'].shift(-i) == True)
-                mask &= (stock['Is_User_Legout'].shift(-(b + 1)) == True)
-                
-                if l_o > 1:
-                    for j in range(2, l_o + 1):
-                        mask &= (stock['Is_Standard_Exciting'].shift(-(b + j)) == True)
-                
-                if strict_mode:
-                    mask &= (stock[c].shift(-(b + 1)) > stock[h])
-                
-                indices = np.where(mask)[0]
-                for idx in indices:
-                    base_candles = stock.iloc[idx + 1 : idx + b + 1]
-                    
-                    # Capture Zone Markings for visuals
-                    if marking_type == "Body to Wick":
-                        zone_high = base_candles[[o, c]].max(axis=1).max()
-                    else:
-                        zone_high = base_candles[h].max()
-                    
-                    # REQUIREMENT: Capture absolute Extremes of Bases for confluence check
-                    base_max_high = base_candles[h].max()
-                    base_min_low = base_candles[l].min()
-
-                    zone_low = min(base_candles[l].min(), stock.iloc[idx + b + 1][l])
-                    if label_name == "Drop-Base-Rally": 
-                        zone_low = min(zone_low, stock.iloc[idx][l])
-                    
-                    test_count, zone_broken = 0, False
-                    future_candles = stock.iloc[idx + b + l_o + 1:]
-                    for _, f_row in future_candles.iterrows():
-                        if f_row[l] <= zone_high:
-                            if f_row[l] < zone_low:
-                                zone_broken = True; break
-                            test_count += 1
-                    
-                    if zone_broken: continue
-                    if (zone_status_limit == "Fresh Only" and test_count > 0) or \
-                       ("Up to 1 time" in zone_status_limit and test_count > 1) or \
-                       ("Up to 2 times" in zone_status_limit and test_count > 2): continue
-                    
-                    if enable_entry_filter:
-                        zone_entry = stock[o].iloc[idx + b + 1]
-                        if not (current_price >= zone_entry and current_price <= (zone_entry * buffer_multiplier)): continue
-                    
-                    rows = stock.iloc[idx : idx + b + l_o + 1].copy()
-                    rows['Pattern_Found'] = label_name
-                    rows['Base_Count'], rows['LegOut_Count'] = b, l_o
-                    rows['LegIn_Date'] = stock.index[idx].strftime('%Y-%m-%d')
-                    rows['Zone_High'], rows['Zone_Low'], rows['Tests'] = zone_high, zone_low, test_count
-                    
-                    # Store absolute values for strict confluence
-                    rows['Base_Max_High'] = base_max_high
-                    rows['Base_Min_Low'] = base_min_low
-                    
-                    rows['Formation_ID'] = f"{TICKER}_{rows['LegIn_Date']}_{label_name}_{b}"
-                    all_found.append(rows)
-        return all_found
+    flags = (stock[col].to_numpy(dtype=bool) for col in ('Is_Base', 'Is_Legin_Green', 'Is_Legin_Red', 'Is_Standard_Exciting',
+                                                          'Is_User_Legout', 'Is_Standard_Exciting_Red', 'Is_User_Legout_Red'))
+    return stock, _detect_zones(_ohlc_arrays(stock), TICKER, pattern_choice, *flags, base_range, legout_range, strict_mode,
+                                entry_buffer_pct, enable_entry_filter, _status_limit(zone_status_limit), marking_type,
+                                include_broken)
 
-    all_results = []
-    if pattern_choice.upper() in ["RBR", "BOTH"]: all_results.extend(find_patterns("Is_Legin_Green", "Rally-Base-Rally"))
-    if pattern_choice.upper() in ["DBR", "BOTH"]: all_results.extend(find_patterns("Is_Legin_Red", "Drop-Base-Rally"))
-    return stock, pd.concat(all_results) if all_results else None
+def find_demand_zones_arrays(index, op, hi, lo, cl, TICKER, pattern_choice, num_bases, num_legouts,
+                             legin_threshold, legout_threshold, base_threshold,
+                             strict_mode, entry_buffer_pct, base_mode, legout_mode,
+                             enable_entry_filter, zone_status_limit, marking_type,
+                             enable_super_exciting=False, super_lookback=20, include_broken=False, offsets=None):
+    """
+    find_demand_zones over bare arrays (e.g. memmap slices): no frame is built or modified. Returns the result or None.
+    Cross-sectional mode: with offsets (len(TICKER) + 1 row boundaries) the arrays hold every ticker back to back
+    and the whole universe is classified, matched and tested in one pass. Rows then carry a Ticker column and
+    per-ticker LegIn_Idx / End_Idx / Break_Idx.
+    """
+    if len(op) == 0: return None
+    seg_end = codes = None
+    if offsets is not None:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        codes = np.repeat(np.arange(len(lengths)), lengths)
+        seg_end = offsets[1:][codes]
+        TICKER = np.asarray(TICKER, dtype=object)[codes]
+    with _stage("features"):
+        flags = candle_flags(op, hi, lo, cl, legin_threshold, legout_threshold, base_threshold,
+                             enable_super_exciting, super_lookback, codes)
+    base_range = [num_bases] if base_mode == "exact" else range(1, num_bases + 1)
+    legout_range = [num_legouts] if legout_mode == "exact" else range(1, num_legouts + 1)
+    result = _detect_zones((index, op, hi, lo, cl), TICKER, pattern_choice, *flags, base_range, legout_range, strict_mode,
+                           entry_buffer_pct, enable_entry_filter, _status_limit(zone_status_limit), marking_type,
+                           include_broken, seg_end)
+    if result is None or offsets is None: return result
+    legin = result['LegIn_Idx'].to_numpy()
+    start = offsets[codes[legin]]
+    result.insert(0, 'Ticker', TICKER[legin])
+    result['LegIn_Idx'], result['End_Idx'] = legin - start, result['End_Idx'].to_numpy() - start
+    if include_broken:
+        result['Break_Idx'] = np.where(result['Break_Idx'] >= 0, result['Break_Idx'] - start, -1)
+    return result
 
 def scan_stock(TICKER, PERIOD, htf_interval, htf_pattern, htf_base_count, htf_legout_count,
                htf_legin_thresh, htf_legout_thresh, htf_bs_thresh, htf_strict_mode,
@@ -146,18 +623,20 @@ def scan_stock(TICKER, PERIOD, htf_interval, htf_pattern, htf_base_count, htf_le
                ltf_interval, ltf_pattern, ltf_base_count, ltf_legout_count,
                ltf_legin_thresh, ltf_legout_thresh, ltf_bs_thresh, ltf_strict_mode,
                ltf_buffer, ltf_base_mode, ltf_legout_mode, ltf_enable_entry_filter, ltf_zone_status, ltf_marking_type,
-               enable_confluence, enable_super_exciting=False, super_lookback=20):
+               enable_confluence, enable_super_exciting=False, super_lookback=20, data=None):
     
-    htf_stock = get_resampled_data(TICKER, PERIOD, htf_interval)
+    if data is None and enable_confluence:
+        data = get_multi_timeframe_data(TICKER, PERIOD, [htf_interval, ltf_interval])
     htf_zones = pd.DataFrame()
+    htf_stock = _scan_frame(data, TICKER, PERIOD, htf_interval) if enable_confluence else pd.DataFrame()
     if enable_confluence and not htf_stock.empty:
         _, htf_result = find_demand_zones(htf_stock, TICKER, htf_pattern, htf_base_count, htf_legout_count, 
                                           htf_legin_thresh, htf_legout_thresh, htf_bs_thresh, htf_strict_mode, 
                                           htf_buffer, htf_base_mode, htf_legout_mode, htf_enable_entry_filter, 
                                           htf_zone_status, htf_marking_type, enable_super_exciting, super_lookback)
-        if htf_result is not None: htf_zones = htf_result.drop_duplicates(subset=['Formation_ID'])
+        if htf_result is not None: htf_zones = htf_result
     
-    ltf_stock = get_resampled_data(TICKER, PERIOD, ltf_interval)
+    ltf_stock = _scan_frame(data, TICKER, PERIOD, ltf_interval)
     if ltf_stock.empty: return None, None, "No data found."
     
     ltf_stock, ltf_result = find_demand_zones(ltf_stock, TICKER, ltf_pattern, ltf_base_count, ltf_legout_count, 
@@ -169,22 +648,62 @@ def scan_stock(TICKER, PERIOD, htf_interval, htf_pattern, htf_base_count, htf_le
         if htf_zones.empty or ltf_result is None:
             return ltf_stock, None, "No Confluence Zone Found"
         
-        confluenced = []
-        ltf_unique = ltf_result.drop_duplicates(subset=['Formation_ID'])
+        # CONFLUENCE REQUIREMENT: LTF Base Wicks (High/Low) must be inside an HTF Zone of the same type
+        with _stage("confluence"):
+            first_match = np.full(len(ltf_result), -1, dtype=np.int64)
+            htf_types, ltf_types = htf_zones['Zone_Type'].to_numpy(), ltf_result['Zone_Type'].to_numpy()
+            for zone_type in np.unique(ltf_types):
+                htf_pos, ltf_pos = np.flatnonzero(htf_types == zone_type), np.flatnonzero(ltf_types == zone_type)
+                if len(htf_pos) == 0: continue
+                htf_index = ZoneIntervalIndex(htf_zones['Zone_Low'].to_numpy()[htf_pos], htf_zones['Zone_High'].to_numpy()[htf_pos])
+                found = htf_index.first_containing(ltf_result['Base_Min_Low'].to_numpy()[ltf_pos],
+                                                   ltf_result['Base_Max_High'].to_numpy()[ltf_pos])
+                first_match[ltf_pos] = np.where(found >= 0, htf_pos[np.maximum(found, 0)], -1)
+        matched = first_match >= 0
         
-        for _, ltf_z in ltf_unique.iterrows():
-            # CONFLUENCE REQUIREMENT: LTF Base Wicks (High/Low) must be inside HTF Zone
-            matches = htf_zones[
-                (htf_zones['Zone_Low'] <= ltf_z['Base_Min_Low']) & 
-                (ltf_z['Base_Max_High'] <= htf_zones['Zone_High'])
-            ]
-            
-            if not matches.empty:
-                ltf_z_copy = ltf_z.copy()
-                ltf_z_copy['HTF_LegIn_Date'] = matches.iloc[0]['LegIn_Date']
-                confluenced.append(ltf_z_copy)
-        
-        if not confluenced: return ltf_stock, None, "No Confluence Zone Found"
-        ltf_result = pd.DataFrame(confluenced)
+        if not matched.any(): return ltf_stock, None, "No Confluence Zone Found"
+        ltf_result = ltf_result[matched].copy()
+        ltf_result['HTF_LegIn_Date'] = htf_zones['LegIn_Date'].to_numpy()[first_match[matched]]
     
-    return ltf_stock, ltf_result, None
\ No newline at end of file
+    return ltf_stock, ltf_result, None
+
+class ScanResultStore:
+    """
+    LRU store of scan_stock outputs keyed on the ticker and every scan parameter.
+    Lets the dashboard redraw charts without re-downloading or re-running detection.
+    """
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(TICKER, PERIOD, *scan_args, **scan_kwargs):
+        bound = inspect.signature(scan_stock).bind(TICKER, PERIOD, *scan_args, **scan_kwargs)
+        bound.apply_defaults()
+        return tuple((name, value) for name, value in bound.arguments.items() if name != 'data')
+
+    def put(self, value, TICKER, PERIOD, *scan_args, **scan_kwargs):
+        key = self.key(TICKER, PERIOD, *scan_args, **scan_kwargs)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+    def get(self, TICKER, PERIOD, *scan_args, **scan_kwargs):
+        key = self.key(TICKER, PERIOD, *scan_args, **scan_kwargs)
+        if key not in self._entries: return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def scan(self, TICKER, PERIOD, *scan_args, **scan_kwargs):
+        """Memoized scan_stock: (stock, result, error)."""
+        cached = self.get(TICKER, PERIOD, *scan_args, **scan_kwargs)
+        if cached is not None: return cached
+        value = scan_stock(TICKER, PERIOD, *scan_args, **scan_kwargs)
+        self.put(value, TICKER, PERIOD, *scan_args, **scan_kwargs)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,103 @@
+import inspect
+import itertools
+import numpy as np
+import pandas as pd
+from scanner import find_demand_zones, candle_features, _detect_zones, _ohlc_arrays, _status_limit, get_multi_timeframe_data_batch, BATCH_SIZE
+
+# find_demand_zones' settings without the frame and ticker; validates and defaults each grid point
+SETTINGS_SIGNATURE = inspect.signature(find_demand_zones).replace(
+    parameters=list(inspect.signature(find_demand_zones).parameters.values())[2:])
+
+class _FeatureCache:
+    """One ticker's candle features and threshold flags, computed once and shared by every grid point."""
+    def __init__(self, stock):
+        self.stock = stock[['Open', 'High', 'Low', 'Close']].copy()
+        self.arrays = _ohlc_arrays(self.stock)
+        op, cl = self.stock['Open'].to_numpy(dtype=float), self.stock['Close'].to_numpy(dtype=float)
+        self.green, self.red = op < cl, op > cl
+        self._features, self._flags = {}, {}
+
+    def features(self, enable_super_exciting, super_lookback):
+        key = (bool(enable_super_exciting), super_lookback if enable_super_exciting else None)
+        if key not in self._features:
+            frame = candle_features(self.stock.copy(), enable_super_exciting, super_lookback)
+            self._features[key] = (frame['Body_Pct'].to_numpy(dtype=float), frame['Range_Qualified'].to_numpy(dtype=bool))
+        return self._features[key]
+
+    def prime(self, grid, params):
+        """Evaluates every distinct threshold of the grid as one broadcast comparison per flag."""
+        for super_on, lookback in itertools.product(grid.get("enable_super_exciting", [params["enable_super_exciting"]]),
+                                                    grid.get("super_lookback", [params["super_lookback"]])):
+            body_pct, qualified = self.features(super_on, lookback)
+            for name, op in (("base_threshold", np.less_equal), ("legin_threshold", np.greater_equal),
+                             ("legout_threshold", np.greater_equal)):
+                values = np.unique(np.asarray(grid.get(name, [params[name]]), dtype=float))
+                hits = op(body_pct[None, :], values[:, None])
+                for value, row in zip(values, hits):
+                    self._flags[(super_on, lookback, name, value)] = row
+
+    def flags(self, params):
+        """candle_flags' seven flags for one parameter set."""
+        super_on, lookback = params["enable_super_exciting"], params["super_lookback"]
+        body_pct, qualified = self.features(super_on, lookback)
+        def cmp(name, op):
+            key = (super_on, lookback, name, float(params[name]))
+            if key not in self._flags: self._flags[key] = op(body_pct, params[name])
+            return self._flags[key]
+        legin = cmp("legin_threshold", np.greater_equal) & qualified
+        exciting, legout = (body_pct >= 50) & qualified, cmp("legout_threshold", np.greater_equal) & qualified
+        return (cmp("base_threshold", np.less_equal), legin & self.green, legin & self.red,
+                exciting & self.green, legout & self.green, exciting & self.red, legout & self.red)
+
+def _grid_points(grid, fixed):
+    """Every grid combination merged over the fixed settings, bound against find_demand_zones' signature."""
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        bound = SETTINGS_SIGNATURE.bind(**{**fixed, **dict(zip(names, values))})
+        bound.apply_defaults()
+        yield dict(zip(names, values)), bound.arguments
+
+def sweep_frame(stock, TICKER, grid, detail=False, **fixed):
+    """
+    Evaluates every combination of `grid` ({param: [values]}) on one ticker's frame.
+    Candle features are computed once and threshold flags once per distinct value; only the
+    pattern match, bounds and tests run per combination. Settings not swept come from **fixed.
+    Returns one row per combination (zone counts), or every zone tagged with its settings if detail.
+    """
+    if stock is None or stock.empty: return pd.DataFrame()
+    cache = _FeatureCache(stock)
+    rows, zones = [], []
+    for i, (point, params) in enumerate(_grid_points(grid, fixed)):
+        if i == 0: cache.prime(grid, params)
+        base_range = [params["num_bases"]] if params["base_mode"] == "exact" else range(1, params["num_bases"] + 1)
+        legout_range = [params["num_legouts"]] if params["legout_mode"] == "exact" else range(1, params["num_legouts"] + 1)
+        result = _detect_zones(cache.arrays, TICKER, params["pattern_choice"], *cache.flags(params), base_range, legout_range,
+                               params["strict_mode"], params["entry_buffer_pct"], params["enable_entry_filter"],
+                               _status_limit(params["zone_status_limit"]), params["marking_type"], params["include_broken"])
+        if detail:
+            if result is not None: zones.append(result.assign(Ticker=TICKER, **point))
+            continue
+        found = result if result is not None else pd.DataFrame(columns=['Pattern_Found', 'Tests'])
+        rows.append({"Ticker": TICKER, **point, "Zones": len(found),
+                     "RBR": int((found['Pattern_Found'] == "Rally-Base-Rally").sum()),
+                     "DBR": int((found['Pattern_Found'] == "Drop-Base-Rally").sum()),
+                     "RBD": int((found['Pattern_Found'] == "Rally-Base-Drop").sum()),
+                     "DBD": int((found['Pattern_Found'] == "Drop-Base-Drop").sum()),
+                     "Fresh": int((found['Tests'] == 0).sum()),
+                     "Avg_Tests": float(found['Tests'].mean()) if len(found) else np.nan})
+    if detail: return pd.concat(zones) if zones else pd.DataFrame()
+    return pd.DataFrame(rows)
+
+def sweep(TICKERS, PERIOD, INTERVAL, grid, data=None, detail=False, batch_size=BATCH_SIZE, use_cache=None, **fixed):
+    """
+    sweep_frame over a universe. Each ticker is fetched once (data: {ticker: frame} or
+    {ticker: {interval: frame}} skips the download) and its features reused across the grid.
+    """
+    if data is None: data = get_multi_timeframe_data_batch(TICKERS, PERIOD, [INTERVAL], batch_size, use_cache)
+    tables = []
+    for ticker in TICKERS:
+        stock = data.get(ticker)
+        if isinstance(stock, dict): stock = stock.get(INTERVAL)
+        table = sweep_frame(stock, ticker, grid, detail, **fixed)
+        if not table.empty: tables.append(table)
+    return pd.concat(tables, ignore_index=not detail) if tables else pd.DataFrame()
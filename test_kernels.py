@@ -0,0 +1,45 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+import bench
+import kernels
+import scanner
+
+STATUSES = ["Fresh Only", "Up to 1 time", "Up to 2 times", "All"]
+PATTERNS = ["Both", "Supply", "All"]
+
+def _use_loop_kernel(monkeypatch):
+    """Routes scanner._zone_tests through the per-zone walk the numba backend compiles, uncompiled."""
+    monkeypatch.setattr(kernels, "get_backend", lambda: "numba")
+    monkeypatch.setattr(kernels, "_zone_tests_jit", kernels._zone_tests_loop)
+
+@pytest.mark.parametrize("block_rows", [1 << 18, 500])
+def test_zone_tests_kernel_parity(block_rows, monkeypatch):
+    monkeypatch.setattr(kernels, "get_backend", lambda: "numpy")
+    monkeypatch.setattr(scanner, "INDEX_BLOCK_ROWS", block_rows)  # 500 indexes the stacked series block by block
+    rng = np.random.default_rng(7)
+    lows = rng.normal(100, 5, 3000).round(1)
+    lows[rng.random(3000) < 0.01] = np.nan
+    ends = np.repeat([700, 1900, 3000], [700, 1200, 1100])  # three stacked series
+    starts = rng.integers(0, 3000, 400)
+    zone_lows = rng.normal(92, 4, 400).round(1)
+    zone_highs = zone_lows + rng.uniform(0, 8, 400).round(1)
+    expected = kernels.zone_tests(lows, starts, zone_lows, zone_highs, ends[starts], kernel=kernels._zone_tests_loop)
+    got = scanner._zone_tests(lows, starts, zone_lows, zone_highs, ends[starts])
+    np.testing.assert_array_equal(got[0], expected[0])
+    np.testing.assert_array_equal(got[1], expected[1])
+
+@pytest.mark.parametrize("pattern, status, include_broken", list(itertools.product(PATTERNS, STATUSES, [False, True])))
+def test_find_demand_zones_kernel_parity(pattern, status, include_broken, monkeypatch):
+    monkeypatch.setattr(kernels, "get_backend", lambda: "numpy")
+    for seed in range(3):
+        stock, _ = bench.synthetic_ohlcv(800, seed)
+        if seed == 2: stock.iloc[[40, 300, 650]] = np.nan
+        args = (pattern, 3, 2, 55, 60, 35, True, 15, "upto", "upto", False, status, "Wick to Wick")
+        _, expected = scanner.find_demand_zones(stock.copy(), "SYN", *args, include_broken=include_broken)
+        with monkeypatch.context() as patched:
+            _use_loop_kernel(patched)
+            _, got = scanner.find_demand_zones(stock.copy(), "SYN", *args, include_broken=include_broken)
+        assert (got is None) == (expected is None)
+        if expected is not None: pd.testing.assert_frame_equal(got, expected)
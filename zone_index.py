@@ -0,0 +1,135 @@
+import numpy as np
+
+class ZoneIntervalIndex:
+    """
+    Static index over [Zone_Low, Zone_High] intervals answering "which zones contain [lo, hi]".
+    Zones are kept sorted by Zone_Low with a running max of Zone_High, so a binary search
+    finds the candidates whose low is <= lo and rejects the query when none reaches hi.
+    """
+    def __init__(self, lows, highs):
+        lows, highs = np.asarray(lows, dtype=float), np.asarray(highs, dtype=float)
+        self.order = np.argsort(lows, kind='stable')
+        self.sorted_lows = lows[self.order]
+        self.sorted_highs = highs[self.order]
+        self.prefix_max_high = np.maximum.accumulate(self.sorted_highs) if len(highs) else self.sorted_highs
+
+    def __len__(self):
+        return len(self.order)
+
+    def _candidates(self, los, his):
+        """Per query: size of the low-sorted prefix with Zone_Low <= lo, and whether any of it reaches hi."""
+        prefix = np.searchsorted(self.sorted_lows, los, side='right')
+        if len(self) == 0: return prefix, np.zeros(len(prefix), dtype=bool)
+        reach = np.where(prefix > 0, self.prefix_max_high[np.maximum(prefix - 1, 0)], -np.inf)
+        return prefix, reach >= his
+
+    def containing(self, lo, hi):
+        """Original positions of every zone with Zone_Low <= lo and hi <= Zone_High, ascending."""
+        prefix, possible = self._candidates(np.array([lo], dtype=float), np.array([hi], dtype=float))
+        if not possible[0]: return np.empty(0, dtype=np.int64)
+        k = prefix[0]
+        return np.sort(self.order[:k][self.sorted_highs[:k] >= hi])
+
+    def first_containing(self, los, his):
+        """
+        Batch query: lowest original position of a zone containing each [lo, hi], -1 if none.
+        Queries failing the O(log n) prefix test are rejected vectorized; the rest are answered
+        offline by sweeping zones in Zone_Low order into a Fenwick tree of minimum positions
+        keyed by descending Zone_High.
+        """
+        los, his = np.asarray(los, dtype=float), np.asarray(his, dtype=float)
+        result = np.full(len(los), -1, dtype=np.int64)
+        if len(self) == 0 or len(los) == 0: return result
+        prefix, possible = self._candidates(los, his)
+        queries = np.flatnonzero(possible)
+        if len(queries) == 0: return result
+
+        unique_highs = np.unique(self.sorted_highs)
+        size = len(unique_highs)
+        zone_rank = size - np.searchsorted(unique_highs, self.sorted_highs)  # 1 = highest Zone_High
+        query_reach = size - np.searchsorted(unique_highs, his[queries])    # ranks with Zone_High >= hi
+        tree = [np.iinfo(np.int64).max] * (size + 1)
+        added = 0
+        for j in np.argsort(prefix[queries], kind='stable'):
+            q = queries[j]
+            while added < prefix[q]:
+                i, pos = int(zone_rank[added]), int(self.order[added])
+                while i <= size:
+                    if pos < tree[i]: tree[i] = pos
+                    i += i & -i
+                added += 1
+            i, best = int(query_reach[j]), np.iinfo(np.int64).max
+            while i > 0:
+                if tree[i] < best: best = tree[i]
+                i -= i & -i
+            result[q] = best
+        return result
+
+class RangeMinIndex:
+    """
+    Sparse table over one price series (or several stacked back to back) for zone break/test queries.
+    table[k, i] = min(values[i:i + 2**k]), NaN counted as +inf; built once in O(n log n).
+    Any range minimum is then two lookups, and "first bar in [start, end) below x" a descent
+    over the levels, O(log n) per query with no per-bar scan.
+    span is the longest [start, end) any query will cover (default len(values)); it sets how many
+    levels are built, e.g. one series' length when several are stacked.
+    """
+    def __init__(self, values, span=None):
+        values = np.asarray(values, dtype=float)
+        values = np.where(np.isnan(values), np.inf, values)
+        n = len(values)
+        span = n if span is None else int(span)
+        # Filled level by level in place (no stacked copy); blocks may run past a series end, but
+        # queries never read a block beyond their own end
+        self.table = np.empty((max(span.bit_length(), 1), n))
+        self.table[0] = values
+        for k in range(1, len(self.table)):
+            prev, level, cut = self.table[k - 1], self.table[k], max(n - (1 << (k - 1)), 0)
+            np.minimum(prev[:cut], prev[n - cut:], out=level[:cut])
+            level[cut:] = prev[cut:]
+
+    def __len__(self):
+        return self.table.shape[1]
+
+    def range_min(self, starts, ends):
+        """min(values[start:end]) per query from two overlapping blocks; +inf for an empty range."""
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        result = np.full(len(starts), np.inf)
+        ok = ends > starts
+        lo, hi = starts[ok], ends[ok]
+        k = np.frexp((hi - lo).astype(float))[1] - 1  # floor(log2(length))
+        result[ok] = np.minimum(self.table[k, lo], self.table[k, hi - (1 << k)])
+        return result
+
+    def first_below(self, starts, ends, x):
+        """First index in [start, end) whose value is below x, end if there is none."""
+        ends = np.asarray(ends, dtype=np.int64)
+        pos = np.minimum(np.asarray(starts, dtype=np.int64), ends)
+        x = np.broadcast_to(np.asarray(x, dtype=float), pos.shape)
+        for k in range(len(self.table) - 1, -1, -1):
+            # Skip a whole 2**k block when it fits and nothing in it is below x
+            jump = np.flatnonzero(pos + (1 << k) <= ends)
+            jump = jump[self.table[k, pos[jump]] >= x[jump]]
+            pos[jump] += 1 << k
+        return pos
+
+    def first_at_most(self, starts, ends, x):
+        """First index in [start, end) whose value is <= x, end if there is none."""
+        return self.first_below(starts, ends, np.nextafter(np.asarray(x, dtype=float), np.inf))
+
+    def count_at_most(self, starts, ends, x, limit=np.inf):
+        """
+        Values <= x in [start, end) per query, one first_at_most hop per counted value.
+        Counting stops once a query passes limit, so the result is min(count, limit + 1).
+        """
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        x = np.broadcast_to(np.asarray(x, dtype=float), starts.shape)
+        counts = np.zeros(len(starts), dtype=np.int64)
+        pos, active = starts.copy(), np.flatnonzero(starts < ends)
+        while len(active):
+            hit = self.first_at_most(pos[active], ends[active], x[active])
+            active, hit = active[hit < ends[active]], hit[hit < ends[active]]
+            counts[active] += 1
+            pos[active] = hit + 1
+            active = active[(pos[active] < ends[active]) & (counts[active] <= limit)]
+        return counts
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from scanner import stamp_format, _zone_tests
+
+ZONE_DB = os.environ.get("ZONE_DB", "zones.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS zones (
+    formation_id TEXT NOT NULL, interval TEXT NOT NULL, ticker TEXT NOT NULL,
+    pattern TEXT, base_count INTEGER, legout_count INTEGER, legin_date TEXT,
+    zone_high REAL, zone_low REAL, base_max_high REAL, base_min_low REAL,
+    tests INTEGER, status TEXT, broken_date TEXT, first_seen TEXT, updated_at TEXT,
+    PRIMARY KEY (formation_id, interval)
+);
+CREATE INDEX IF NOT EXISTS zones_by_ticker ON zones (ticker, interval, status);
+CREATE INDEX IF NOT EXISTS zones_by_band ON zones (status, zone_low, zone_high);
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT PRIMARY KEY, close REAL, price_date TEXT, updated_at TEXT
+);
+"""
+
+def zone_status(tests, broken):
+    return "broken" if broken else ("fresh" if tests == 0 else "tested")
+
+class ZoneStore:
+    """
+    SQLite store of every zone ever reported, keyed by (Formation_ID, interval).
+    record_scan() upserts a scan result and re-checks stored zones the scan no longer reports
+    (filtered out or broken) against the scanned bars, so status moves fresh -> tested -> broken.
+    """
+    def __init__(self, path=ZONE_DB):
+        self.path = path
+        # Streamlit reruns on different threads; one connection guarded by a lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_scan(self, TICKER, INTERVAL, stock, result):
+        """Saves one ticker's scan (stock: the scanned frame, result: find_demand_zones/scan_stock zones or None)."""
+        if stock is None or stock.empty: return
+        now = pd.Timestamp.now().isoformat(timespec='seconds')
+        seen = set()
+        rows = []
+        if result is not None and not result.empty:
+            # l_o variants share a Formation_ID; keep the longest leg-out like the dashboards do
+            result = result.sort_values('LegOut_Count', ascending=False).drop_duplicates(subset=['Formation_ID'])
+            for p in result.itertuples(index=False):
+                seen.add(p.Formation_ID)
+                rows.append((p.Formation_ID, INTERVAL, TICKER, p.Pattern_Found, int(p.Base_Count), int(p.LegOut_Count),
+                             p.LegIn_Date, float(p.Zone_High), float(p.Zone_Low), float(p.Base_Max_High),
+                             float(p.Base_Min_Low), int(p.Tests), zone_status(p.Tests, False), now, now))
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO zones (formation_id, interval, ticker, pattern, base_count, legout_count, legin_date,
+                                   zone_high, zone_low, base_max_high, base_min_low, tests, status, first_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (formation_id, interval) DO UPDATE SET
+                    legout_count = excluded.legout_count, tests = excluded.tests, status = excluded.status,
+                    broken_date = NULL, updated_at = excluded.updated_at""", rows)
+            self._refresh_unseen(TICKER, INTERVAL, stock, seen, now)
+            self.conn.execute("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)",
+                              (TICKER, float(stock['Close'].iloc[-1]), stock.index[-1].strftime('%Y-%m-%d'), now))
+
+    def _refresh_unseen(self, TICKER, INTERVAL, stock, seen, now):
+        stored = pd.read_sql_query(
+            "SELECT formation_id, pattern, legin_date, base_count, legout_count, zone_high, zone_low FROM zones "
+            "WHERE ticker = ? AND interval = ? AND status != 'broken'", self.conn, params=(TICKER, INTERVAL))
+        stored = stored[~stored['formation_id'].isin(seen)]
+        if stored.empty: return
+        dates = stock.index.strftime(stamp_format(stock.index))
+        pos = dates.searchsorted(stored['legin_date'].to_numpy())
+        # Zones older than the scanned lookback cannot be re-checked; leave them as they were
+        known = (pos < len(dates)) & (dates[np.minimum(pos, len(dates) - 1)] == stored['legin_date'].to_numpy())
+        stored, pos = stored[known], pos[known]
+        if stored.empty: return
+        starts = pos + stored['base_count'].to_numpy() + stored['legout_count'].to_numpy() + 1
+        zone_lows, zone_highs = stored['zone_low'].to_numpy(dtype=float), stored['zone_high'].to_numpy(dtype=float)
+        tests, break_idx = _zone_tests(stock['Low'].to_numpy(dtype=float), starts, zone_lows, zone_highs)
+        # Supply zones (leg-out drops) break upwards: re-check them on negated highs
+        supply = stored['pattern'].str.endswith("Drop").to_numpy()
+        if supply.any():
+            tests[supply], break_idx[supply] = _zone_tests(-stock['High'].to_numpy(dtype=float), starts[supply],
+                                                           -zone_highs[supply], -zone_lows[supply])
+        self.conn.executemany(
+            "UPDATE zones SET tests = ?, status = ?, broken_date = ?, updated_at = ? WHERE formation_id = ? AND interval = ?",
+            [(int(t), zone_status(t, b >= 0), dates[b] if b >= 0 else None, now, fid, INTERVAL)
+             for fid, t, b in zip(stored['formation_id'], tests, break_idx)])
+
+    def zones(self, TICKER=None, INTERVAL=None, statuses=None):
+        """Stored zones, optionally filtered by ticker, interval and status list."""
+        query, params = "SELECT * FROM zones WHERE 1 = 1", []
+        if TICKER is not None: query += " AND ticker = ?"; params.append(TICKER)
+        if INTERVAL is not None: query += " AND interval = ?"; params.append(INTERVAL)
+        if statuses:
+            query += f" AND status IN ({', '.join('?' * len(statuses))})"; params.extend(statuses)
+        with self._lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    def near_price(self, pct=5.0, statuses=("fresh",), INTERVAL=None):
+        """Zones overlapping the band last close +/- pct%, nearest first (uses the last recorded close per ticker)."""
+        band = pct / 100
+        query = f"""
+            SELECT z.*, p.close AS price, (p.close - z.zone_high) / p.close * 100 AS distance_pct
+            FROM zones z JOIN prices p ON p.ticker = z.ticker
+            WHERE z.status IN ({', '.join('?' * len(statuses))})
+              AND z.zone_high >= p.close * (1 - ?) AND z.zone_low <= p.close * (1 + ?)"""
+        params = list(statuses) + [band, band]
+        if INTERVAL is not None: query += " AND z.interval = ?"; params.append(INTERVAL)
+        query += " ORDER BY abs(p.close - z.zone_high) / p.close"
+        with self._lock:
+            return pd.read_sql_query(query, self.conn, params=params)